@@ -0,0 +1,104 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('AMS.performance')
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings collected for a single request.
+
+    An instance is installed as a database ``execute_wrapper`` so every query
+    issued while the request is being handled is counted and timed.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.sections = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+
+    def add_section(self, name, elapsed):
+        self.sections[name] = self.sections.get(name, 0.0) + elapsed
+
+    def server_timing(self, total):
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"']
+        entries.extend(f'{name};dur={elapsed * 1000:.1f}' for name, elapsed in self.sections.items())
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def as_dict(self, total):
+        return {
+            'query_count': self.query_count,
+            'db_ms': round(self.db_time * 1000, 1),
+            'sections_ms': {name: round(elapsed * 1000, 1) for name, elapsed in self.sections.items()},
+            'total_ms': round(total * 1000, 1),
+        }
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+@contextmanager
+def timed(section):
+    """Attribute the wall time of the enclosed block to ``section`` (e.g. ``pandas``, ``model``)."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_section(section, time.perf_counter() - start)
+
+
+class PerformanceInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERFORMANCE_LOG_SAMPLE_RATE', 0.0)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', settings.DEBUG)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        total = time.perf_counter() - start
+
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing(total)
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **metrics.as_dict(total),
+            }
+            logger.info(json.dumps(record))
+
+        return response
@@ -0,0 +1,81 @@
+"""JSON encoding for API responses, using orjson when it is installed.
+
+orjson writes datetimes and times with full microsecond precision
+("...05.123456Z"), where DjangoJSONEncoder truncates them to milliseconds
+("...05.123Z"). Both are ISO 8601; the json fallback keeps Django's format.
+"""
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.http import JsonResponse as DjangoJsonResponse
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import numpy as np
+import pandas as pd
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def default(value):
+    """Encode the types orjson leaves to us the way DjangoJSONEncoder does; Decimals become exact strings."""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        if pd.isna(value):
+            return None
+        # pandas Timestamps and other datetime subclasses, handed back to orjson as plain datetimes.
+        return datetime.datetime(value.year, value.month, value.day, value.hour, value.minute, value.second,
+                                 value.microsecond, value.tzinfo)
+    if isinstance(value, (datetime.date, datetime.time, datetime.timedelta, uuid.UUID, Promise)):
+        return _django_encoder.default(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FallbackEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, datetime.datetime) and pd.isna(o):
+            return None
+        if isinstance(o, (datetime.date, datetime.time, datetime.timedelta, decimal.Decimal, uuid.UUID, Promise)):
+            return super().default(o)
+        return default(o)
+
+
+def dumps(data):
+    """Serialize ``data`` to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=FallbackEncoder, separators=(',', ':')).encode()
+
+
+class JsonResponse(DjangoJsonResponse):
+    """Drop-in replacement for ``django.http.JsonResponse`` that encodes with ``dumps``."""
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault('content_type', 'application/json')
+        HttpResponse.__init__(self, content=dumps(data), **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data)
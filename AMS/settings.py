@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'AMS.instrumentation.PerformanceInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,6 +96,35 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# The cache is shared by every web process and the job worker: data versions,
+# user identities, cached responses and coalesced results must agree everywhere.
+# Redis is used when REDIS_URL is set; otherwise the database cache table
+# (`manage.py createcachetable`), where every cache lookup is a query, so
+# answering a 304 without touching the database needs Redis.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'TIMEOUT': 60 * 60,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'ams_cache',
+            'TIMEOUT': 60 * 60,
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -142,6 +172,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'AMS.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -167,6 +201,59 @@ AUTHENTICATION_BACKENDS = [
     'rest_framework_simplejwt.authentication.JWTAuthentication',
 ]
 
+# Largest JSON body the bulk import endpoints accept; every other endpoint keeps
+# DATA_UPLOAD_MAX_MEMORY_SIZE. CSV files are streamed through the upload handlers instead.
+IMPORT_MAX_BODY_SIZE = int(os.getenv('IMPORT_MAX_BODY_SIZE', 50 * 1024 * 1024))
+
+# Per-request instrumentation: a sample of requests is written to the 'AMS.performance'
+# logger. The Server-Timing header exposes timings to every client, so it is only sent
+# in DEBUG unless enabled explicitly.
+PERFORMANCE_SERVER_TIMING = DEBUG
+PERFORMANCE_LOG_SAMPLE_RATE = float(os.getenv('PERFORMANCE_LOG_SAMPLE_RATE', '0.05'))
+
+# Background jobs run by `manage.py run_worker`.
+JOB_WORKER_PROCESSES = int(os.getenv('JOB_WORKER_PROCESSES', '2'))
+# Workers renew a job's lease every heartbeat; a job whose lease lapses is claimed again.
+JOB_LEASE_SECONDS = 5 * 60
+JOB_HEARTBEAT_SECONDS = 60
+JOB_RETRY_BACKOFF_SECONDS = 30
+JOB_RESULT_TTL_SECONDS = 24 * 60 * 60
+
+# Identical concurrent projection and report requests share one computation.
+COALESCE_WAIT_SECONDS = 120
+COALESCE_POLL_SECONDS = 0.1
+COALESCE_RESULT_TTL_SECONDS = 10
+
+# Concurrency limits for expensive analytics endpoints (see operations.admission).
+ADMISSION_POOLS = {
+    'projection': {'concurrency': 4, 'per_business': 2, 'max_queue': 8, 'max_wait': 10},
+    'simulation': {'concurrency': 4, 'per_business': 2, 'max_queue': 8, 'max_wait': 10},
+}
+ADMISSION_POLL_SECONDS = 0.05
+# Slots held by a process that died are freed once a pool has been idle this long.
+ADMISSION_SLOT_TTL_SECONDS = 10 * 60
+
+# Read-heavy finance endpoints cache their responses per business data version and send ETags.
+RESPONSE_CACHE_TIMEOUT = 15 * 60
+USER_IDENTITY_CACHE_TIMEOUT = 5 * 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'AMS.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
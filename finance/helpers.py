@@ -1,15 +1,130 @@
+import base64
+import hashlib
+import json
 from datetime import date, timedelta
 from decimal import Decimal
-from django.db.models import Sum
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import numpy as np
 from datetime import date
-from finance.models import PaymentSchedule, Income, Expense, AccountsReceivable, AccountsPayable
+
+from AMS.instrumentation import timed
+from operations.versioning import bump_data_version_on_commit
+from users.models import Business
+from finance.models import CURRENCY_CHOICES, PaymentSchedule, Income, Expense, AccountsReceivable, AccountsPayable, Asset, \
+    MacroAssumption, PaymentInstallment, Liability, Collateral, InterestAccrual, ChangeLogEntry
 import pandas as pd
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from pmdarima import auto_arima
 
 
-def perform_projection(business, period, forecast_steps, seasonal_period):
+REPORT_LAYOUTS = ('records', 'columnar')
+
+
+def get_forecast_labels(period, forecast_steps):
+    today = pd.Timestamp.today()
+    labels = []
+    for i in range(forecast_steps):
+        if period == 'daily':
+            labels.append((today + pd.DateOffset(days=i + 1)).strftime('%Y-%m-%d'))
+        elif period == 'weekly':
+            labels.append((today + pd.DateOffset(weeks=i + 1)).strftime('%Y-%W%U'))
+        elif period == 'bi-weekly':
+            labels.append((today + pd.DateOffset(weeks=2 * (i + 1))).strftime('%Y-%W%U'))
+        elif period == 'quarterly':
+            date = today + pd.DateOffset(months=3 * (i + 1))
+            labels.append(date.strftime('%Y-Q{}').format((date.month - 1) // 3 + 1))
+        elif period == 'yearly':
+            labels.append((today + pd.DateOffset(years=i + 1)).strftime('%Y'))
+        else:
+            labels.append((today + pd.DateOffset(months=i + 1)).strftime('%Y-%m'))
+    return labels
+
+
+def format_predictions(labels, forecast, value_key, layout='records'):
+    values = np.asarray(forecast, dtype=float)
+    if layout == 'columnar':
+        return {'length': len(labels), 'columns': {'date': list(labels), value_key: money_strings(values)}}
+    return [{'date': label, value_key: float(value)} for label, value in zip(labels, values)]
+
+
+def money_strings(values):
+    """Format amounts as two-decimal strings, with missing values as None, so columns never carry binary floats."""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    missing = ~np.isfinite(values)
+    cents = np.rint(np.where(missing, 0, values) * 100).astype(np.int64)
+    units, fraction = np.divmod(np.abs(cents), 100)
+    return [None if blank else f"{'-' if cent < 0 else ''}{unit}.{part:02d}"
+            for blank, cent, unit, part in zip(missing.tolist(), cents.tolist(), units.tolist(), fraction.tolist())]
+
+
+def frame_to_columns(df, date_unit='D', rate_columns=()):
+    """Serialize a report frame as parallel column arrays instead of one dict per row.
+
+    Every layout='columnar' response has this ``{'length': n, 'columns': {...}}``
+    shape. Amounts are two-decimal strings; only ``rate_columns`` stay numeric.
+    """
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if name == 'date':
+            dates = pd.to_datetime(series, utc=True).dt.tz_localize(None).to_numpy(dtype=f'datetime64[{date_unit}]')
+            columns[name] = np.datetime_as_string(dates, timezone='naive' if date_unit == 'D' else 'UTC').tolist()
+        elif name in rate_columns:
+            columns[name] = pd.to_numeric(series, errors='coerce').astype(float).tolist()
+        else:
+            columns[name] = money_strings(series)
+    return {'length': len(df), 'columns': columns}
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of at most ``max_points`` points that keep the visual shape of the series.
+
+    Largest-triangle-three-buckets: the first and last points are kept and the
+    rest are split into ``max_points - 2`` buckets. From each bucket we keep the
+    point forming the largest triangle with the point kept from the previous
+    bucket and the average of the next one. Bucket averages are computed in one
+    pass; only the per-bucket argmax walks the buckets.
+    """
+    n = len(x)
+    if max_points is None or max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    avg_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        area = np.abs((x[a] - next_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_frame(df, value_column, max_points):
+    """Reduce a dated report frame to at most ``max_points`` rows with LTTB on ``value_column``."""
+    if max_points is None or len(df) <= max_points:
+        return df
+    x = pd.to_datetime(df['date'], utc=True).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    y = pd.to_numeric(df[value_column], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return df.iloc[lttb_indices(x, y, max_points)]
+
+
+def perform_projection(business, period, forecast_steps, seasonal_period, layout='records'):
     incomes = list(Income.objects.filter(business=business).values('date', 'amount'))
     expenses = list(Expense.objects.filter(business=business).values('date', 'amount'))
 
@@ -18,94 +133,48 @@ def perform_projection(business, period, forecast_steps, seasonal_period):
     if not expenses:
         raise ValueError("No expense data found for the business.")
 
-    df_incomes = pd.DataFrame(incomes)
-    df_expenses = pd.DataFrame(expenses)
+    with timed('pandas'):
+        df_incomes = pd.DataFrame(incomes)
+        df_expenses = pd.DataFrame(expenses)
+
+        df_incomes['amount'] = pd.to_numeric(df_incomes['amount'], errors='coerce')
+        df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
+
+        if 'date' not in df_incomes.columns or 'date' not in df_expenses.columns:
+            raise KeyError("'date' column missing from income or expense data.")
+
+        df_incomes.sort_values('date', inplace=True)
+        df_expenses.sort_values('date', inplace=True)
+        df_incomes.rename(columns={'amount': 'inflow'}, inplace=True)
+        df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
+        df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
+        df['net_cash_flow'] = df['inflow'] - df['outflow']
+        df['date'] = pd.to_datetime(df['date'])
+        df.set_index('date', inplace=True)
+
+        if period == 'daily':
+            cash_flow = df.resample('D').sum()['net_cash_flow']
+        elif period == 'weekly':
+            cash_flow = df.resample('W').sum()['net_cash_flow']
+        elif period == 'bi-weekly':
+            cash_flow = df.resample('2W').sum()['net_cash_flow']
+        elif period == 'quarterly':
+            cash_flow = df.resample('Q').sum()['net_cash_flow']
+        elif period == 'yearly':
+            cash_flow = df.resample('Y').sum()['net_cash_flow']
+        else:
+            cash_flow = df.resample('M').sum()['net_cash_flow']
 
-    df_incomes['amount'] = pd.to_numeric(df_incomes['amount'], errors='coerce')
-    df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
+    with timed('model'):
+        model = auto_arima(cash_flow, seasonal=True, m=seasonal_period,
+                           stepwise=True, trace=False, error_action='ignore', suppress_warnings=True)
 
-    if 'date' not in df_incomes.columns or 'date' not in df_expenses.columns:
-        raise KeyError("'date' column missing from income or expense data.")
+        mse = mean_squared_error(cash_flow, model.predict_in_sample())
+        mae = mean_absolute_error(cash_flow, model.predict_in_sample())
 
-    df_incomes.sort_values('date', inplace=True)
-    df_expenses.sort_values('date', inplace=True)
-    df_incomes.rename(columns={'amount': 'inflow'}, inplace=True)
-    df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
-    df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
-    df['net_cash_flow'] = df['inflow'] - df['outflow']
-    df['date'] = pd.to_datetime(df['date'])
-    df.set_index('date', inplace=True)
-
-    if period == 'daily':
-        cash_flow = df.resample('D').sum()['net_cash_flow']
-    elif period == 'weekly':
-        cash_flow = df.resample('W').sum()['net_cash_flow']
-    elif period == 'bi-weekly':
-        cash_flow = df.resample('2W').sum()['net_cash_flow']
-    elif period == 'quarterly':
-        cash_flow = df.resample('Q').sum()['net_cash_flow']
-    elif period == 'yearly':
-        cash_flow = df.resample('Y').sum()['net_cash_flow']
-    else:
-        cash_flow = df.resample('M').sum()['net_cash_flow']
-
-    print("Cash Flow:")
-    print(cash_flow)
-
-    model = auto_arima(cash_flow, seasonal=True, m=seasonal_period,
-                       stepwise=True, trace=True, error_action='ignore', suppress_warnings=True)
-
-    print("Best SARIMA Model:")
-    print(model.summary())
-
-    mse = mean_squared_error(cash_flow, model.predict_in_sample())
-    mae = mean_absolute_error(cash_flow, model.predict_in_sample())
-
-    forecast = model.predict(n_periods=forecast_steps)
-    predictions = []
-
-    if period == 'daily':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(days=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'predicted_cash_flow': float(forecast[i])
-            })
-    elif period == 'weekly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(weeks=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%W%U'),
-                'predicted_cash_flow': float(forecast[i])
-            })
-    elif period == 'bi-weekly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(weeks=2 * (i + 1))
-            predictions.append({
-                'date': date.strftime('%Y-%W%U'),
-                'predicted_cash_flow': float(forecast[i])
-            })
-    elif period == 'quarterly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(months=3 * (i + 1))
-            predictions.append({
-                'date': date.strftime('%Y-Q{}').format((date.month - 1) // 3 + 1),
-                'predicted_cash_flow': float(forecast[i])
-            })
-    elif period == 'yearly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(years=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y'),
-                'predicted_cash_flow': float(forecast[i])
-            })
-    else:
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(months=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%m'),
-                'predicted_cash_flow': float(forecast[i])
-            })
+        forecast = model.predict(n_periods=forecast_steps)
+    labels = get_forecast_labels(period, forecast_steps)
+    predictions = format_predictions(labels, forecast, 'predicted_cash_flow', layout)
 
     return {
         "predictions": predictions,
@@ -114,93 +183,47 @@ def perform_projection(business, period, forecast_steps, seasonal_period):
     }
 
 
-def perform_cash_outflow_projection(business, period, forecast_steps, seasonal_period):
+def perform_cash_outflow_projection(business, period, forecast_steps, seasonal_period, layout='records'):
     expenses = list(Expense.objects.filter(business=business).values('date', 'amount'))
 
     if not expenses:
         raise ValueError("No expense data found for the business.")
 
-    df_expenses = pd.DataFrame(expenses)
-    df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
+    with timed('pandas'):
+        df_expenses = pd.DataFrame(expenses)
+        df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
+
+        if 'date' not in df_expenses.columns:
+            raise KeyError("'date' column missing from expense data.")
+
+        df_expenses.sort_values('date', inplace=True)
+        df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
+        df_expenses['date'] = pd.to_datetime(df_expenses['date'])
+        df_expenses.set_index('date', inplace=True)
+
+        if period == 'daily':
+            outflow = df_expenses.resample('D').sum()['outflow']
+        elif period == 'weekly':
+            outflow = df_expenses.resample('W').sum()['outflow']
+        elif period == 'bi-weekly':
+            outflow = df_expenses.resample('2W').sum()['outflow']
+        elif period == 'quarterly':
+            outflow = df_expenses.resample('Q').sum()['outflow']
+        elif period == 'yearly':
+            outflow = df_expenses.resample('Y').sum()['outflow']
+        else:
+            outflow = df_expenses.resample('M').sum()['outflow']
 
-    if 'date' not in df_expenses.columns:
-        raise KeyError("'date' column missing from expense data.")
+    with timed('model'):
+        model = auto_arima(outflow, seasonal=True, m=seasonal_period,
+                           stepwise=True, trace=False, error_action='ignore', suppress_warnings=True)
 
-    df_expenses.sort_values('date', inplace=True)
-    df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
-    df_expenses['date'] = pd.to_datetime(df_expenses['date'])
-    df_expenses.set_index('date', inplace=True)
-
-    if period == 'daily':
-        outflow = df_expenses.resample('D').sum()['outflow']
-    elif period == 'weekly':
-        outflow = df_expenses.resample('W').sum()['outflow']
-    elif period == 'bi-weekly':
-        outflow = df_expenses.resample('2W').sum()['outflow']
-    elif period == 'quarterly':
-        outflow = df_expenses.resample('Q').sum()['outflow']
-    elif period == 'yearly':
-        outflow = df_expenses.resample('Y').sum()['outflow']
-    else:
-        outflow = df_expenses.resample('M').sum()['outflow']
-
-    print("Outflow:")
-    print(outflow)
-
-    model = auto_arima(outflow, seasonal=True, m=seasonal_period,
-                       stepwise=True, trace=True, error_action='ignore', suppress_warnings=True)
-
-    print("Best SARIMA Model:")
-    print(model.summary())
-
-    mse = mean_squared_error(outflow, model.predict_in_sample())
-    mae = mean_absolute_error(outflow, model.predict_in_sample())
-
-    forecast = model.predict(n_periods=forecast_steps)
-    predictions = []
-
-    if period == 'daily':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(days=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'predicted_outflow': float(forecast[i])
-            })
-    elif period == 'weekly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(weeks=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%W%U'),
-                'predicted_outflow': float(forecast[i])
-            })
-    elif period == 'bi-weekly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(weeks=2 * (i + 1))
-            predictions.append({
-                'date': date.strftime('%Y-%W%U'),
-                'predicted_outflow': float(forecast[i])
-            })
-    elif period == 'quarterly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(months=3 * (i + 1))
-            predictions.append({
-                'date': date.strftime('%Y-Q{}').format((date.month - 1) // 3 + 1),
-                'predicted_outflow': float(forecast[i])
-            })
-    elif period == 'yearly':
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(years=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y'),
-                'predicted_outflow': float(forecast[i])
-            })
-    else:
-        for i in range(forecast_steps):
-            date = pd.Timestamp.today() + pd.DateOffset(months=i + 1)
-            predictions.append({
-                'date': date.strftime('%Y-%m'),
-                'predicted_outflow': float(forecast[i])
-            })
+        mse = mean_squared_error(outflow, model.predict_in_sample())
+        mae = mean_absolute_error(outflow, model.predict_in_sample())
+
+        forecast = model.predict(n_periods=forecast_steps)
+    labels = get_forecast_labels(period, forecast_steps)
+    predictions = format_predictions(labels, forecast, 'predicted_outflow', layout)
 
     return {
         "predictions": predictions,
@@ -209,7 +232,8 @@ def perform_cash_outflow_projection(business, period, forecast_steps, seasonal_p
     }
 
 
-def generate_report_based_on_date_range(business, start_date=None, end_date=None):
+def generate_report_based_on_date_range(business, start_date=None, end_date=None, layout='records',
+                                        max_points=None):
     incomes = list(Income.objects.filter(business=business).values('date', 'amount'))
     expenses = list(Expense.objects.filter(business=business).values('date', 'amount'))
 
@@ -218,22 +242,26 @@ def generate_report_based_on_date_range(business, start_date=None, end_date=None
     if not expenses:
         raise ValueError("No expense data found for the business.")
 
-    df_incomes = pd.DataFrame(incomes)
-    df_expenses = pd.DataFrame(expenses)
-    df_incomes.sort_values('date', inplace=True)
-    df_expenses.sort_values('date', inplace=True)
-    df_incomes.rename(columns={'amount': 'inflow'}, inplace=True)
-    df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
-    df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
-    df['net_cash_flow'] = df['inflow'] - df['outflow']
+    with timed('pandas'):
+        df_incomes = pd.DataFrame(incomes)
+        df_expenses = pd.DataFrame(expenses)
+        df_incomes.sort_values('date', inplace=True)
+        df_expenses.sort_values('date', inplace=True)
+        df_incomes.rename(columns={'amount': 'inflow'}, inplace=True)
+        df_expenses.rename(columns={'amount': 'outflow'}, inplace=True)
+        df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
+        df['net_cash_flow'] = df['inflow'] - df['outflow']
+
+        df['date'] = pd.to_datetime(df['date']).dt.date
 
-    df['date'] = pd.to_datetime(df['date']).dt.date
+        if start_date and end_date:
+            df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
 
-    if start_date and end_date:
-        df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+        df = downsample_frame(df, 'net_cash_flow', max_points)
 
-    print(df.to_dict)
-    return df.to_dict('records')
+        if layout == 'columnar':
+            return frame_to_columns(df)
+        return df.to_dict('records')
 
 
 def generate_report_based_on_period(business, period=None):
@@ -255,7 +283,6 @@ def generate_report_based_on_period(business, period=None):
     report['net_cash_flow'] = report['inflow'] - report['outflow']
 
     report.reset_index(inplace=True)
-    print(f'Final report head:\n{report.head()}')
 
     return report.to_dict('records')
 
@@ -344,7 +371,7 @@ def calculate_real_time_data(alert_threshold):
     return real_time_data, alerts
 
 
-def create_financial_dataframe(business):
+def create_financial_dataframe(business, layout='records', max_points=None):
     incomes = list(Income.objects.filter(business=business).values('date', 'amount'))
     expenses = list(Expense.objects.filter(business=business).values('date', 'amount'))
 
@@ -353,46 +380,54 @@ def create_financial_dataframe(business):
     if not expenses:
         raise ValueError("No expense data found for the business.")
 
-    df_incomes = pd.DataFrame(incomes)
-    df_expenses = pd.DataFrame(expenses)
+    with timed('pandas'):
+        df_incomes = pd.DataFrame(incomes)
+        df_expenses = pd.DataFrame(expenses)
 
-    df_incomes['amount'] = pd.to_numeric(df_incomes['amount'], errors='coerce')
-    df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
+        df_incomes['amount'] = pd.to_numeric(df_incomes['amount'], errors='coerce')
+        df_expenses['amount'] = pd.to_numeric(df_expenses['amount'], errors='coerce')
 
-    if 'date' not in df_incomes.columns or 'date' not in df_expenses.columns:
-        raise KeyError("'date' column missing from income or expense data.")
+        if 'date' not in df_incomes.columns or 'date' not in df_expenses.columns:
+            raise KeyError("'date' column missing from income or expense data.")
 
-    df_incomes['date'] = pd.to_datetime(df_incomes['date'])
-    df_expenses['date'] = pd.to_datetime(df_expenses['date'])
+        df_incomes['date'] = pd.to_datetime(df_incomes['date'])
+        df_expenses['date'] = pd.to_datetime(df_expenses['date'])
 
-    df_incomes.sort_values('date', inplace=True)
-    df_expenses.sort_values('date', inplace=True)
+        df_incomes.sort_values('date', inplace=True)
+        df_expenses.sort_values('date', inplace=True)
 
-    df_incomes.rename(columns={'amount': 'income'}, inplace=True)
-    df_expenses.rename(columns={'amount': 'expense'}, inplace=True)
+        df_incomes.rename(columns={'amount': 'income'}, inplace=True)
+        df_expenses.rename(columns={'amount': 'expense'}, inplace=True)
 
-    df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
+        df = pd.merge(df_incomes, df_expenses, on='date', how='outer').fillna(0)
 
-    df['difference'] = df['income'] - df['expense']
+        df['difference'] = df['income'] - df['expense']
 
-    inflation_rate = 0.3480
-    interest_rate = 0.275
+        interest_rate, inflation_rate = (float(rate) for rate in MacroAssumption.current_rates(business.id))
 
-    df['inflation_rate'] = inflation_rate
-    df['interest_rate'] = interest_rate
+        df['inflation_rate'] = inflation_rate
+        df['interest_rate'] = interest_rate
 
-    df['balance_brought_down'] = df['difference'].cumsum()
+        df['balance_brought_down'] = df['difference'].cumsum()
 
-    adjusted_rate = (1 + interest_rate) * (1 + inflation_rate) - 1
-    df['face_value'] = df['difference'] / (1 + adjusted_rate)
+        adjusted_rate = (1 + interest_rate) * (1 + inflation_rate) - 1
+        df['face_value'] = df['difference'] / (1 + adjusted_rate)
 
-    df.set_index('date', inplace=True)
+        df = downsample_frame(df, 'difference', max_points)
 
-    return df.reset_index().to_dict('records')
+        if layout == 'columnar':
+            return frame_to_columns(df, date_unit='s', rate_columns=('inflation_rate', 'interest_rate'))
+        return df.to_dict('records')
 
 
-def scenario_analysis(business, income_adjustment=0, expense_adjustment=0, inflation_rate=0.3480, interest_rate=0.2750,
+def scenario_analysis(business, income_adjustment=0, expense_adjustment=0, inflation_rate=None, interest_rate=None,
                       start_date=None, end_date=None):
+    current_interest_rate, current_inflation_rate = MacroAssumption.current_rates(business.id)
+    if inflation_rate is None:
+        inflation_rate = float(current_inflation_rate)
+    if interest_rate is None:
+        interest_rate = float(current_interest_rate)
+
     dataframe = create_financial_dataframe(business)
     df = pd.DataFrame(dataframe)
     df.set_index('date', inplace=True)
@@ -413,6 +448,100 @@ def scenario_analysis(business, income_adjustment=0, expense_adjustment=0, infla
     return df.reset_index().to_dict('records')
 
 
+SCENARIO_GRID_CHUNK_CELLS = 5_000_000
+
+
+def get_ledger_arrays(business, start_date=None, end_date=None):
+    """Income and expense amounts of every ledger entry, in date order, as two aligned float arrays."""
+    incomes = Income.objects.filter(business=business)
+    expenses = Expense.objects.filter(business=business)
+    if start_date:
+        incomes = incomes.filter(date__date__gte=start_date)
+        expenses = expenses.filter(date__date__gte=start_date)
+    if end_date:
+        incomes = incomes.filter(date__date__lte=end_date)
+        expenses = expenses.filter(date__date__lte=end_date)
+
+    income_rows = list(incomes.values_list('date', 'amount'))
+    expense_rows = list(expenses.values_list('date', 'amount'))
+    if not income_rows:
+        raise ValueError("No income data found for the business.")
+    if not expense_rows:
+        raise ValueError("No expense data found for the business.")
+
+    income_dates, income_amounts = zip(*income_rows)
+    expense_dates, expense_amounts = zip(*expense_rows)
+    dates = pd.to_datetime(income_dates + expense_dates, utc=True).asi8
+    income = np.concatenate([np.asarray(income_amounts, dtype=float), np.zeros(len(expense_amounts))])
+    expense = np.concatenate([np.zeros(len(income_amounts)), np.asarray(expense_amounts, dtype=float)])
+    order = np.argsort(dates, kind='stable')
+    return income[order], expense[order]
+
+
+def evaluate_scenario_grid(business, income_adjustments, expense_adjustments, inflation_rates=None,
+                           interest_rates=None, start_date=None, end_date=None):
+    """Summary metrics of ``scenario_analysis`` for every combination of adjustments and rates.
+
+    The ledger is loaded once and each metric is broadcast over an
+    (income, expense, inflation, interest) grid. Running balances are the only
+    per-entry quantity, so they are evaluated in blocks of (income, expense)
+    adjustment pairs holding at most SCENARIO_GRID_CHUNK_CELLS values.
+    """
+    current_interest_rate, current_inflation_rate = MacroAssumption.current_rates(business.id)
+    if not inflation_rates:
+        inflation_rates = [float(current_inflation_rate)]
+    if not interest_rates:
+        interest_rates = [float(current_interest_rate)]
+
+    income, expense = get_ledger_arrays(business, start_date, end_date)
+    cumulative_income = np.cumsum(income)
+    cumulative_expense = np.cumsum(expense)
+
+    income_factor = 1 + np.asarray(income_adjustments, dtype=float)
+    expense_factor = 1 + np.asarray(expense_adjustments, dtype=float)
+    inflation = np.asarray(inflation_rates, dtype=float)
+    interest = np.asarray(interest_rates, dtype=float)
+
+    total_income = income_factor[:, None] * cumulative_income[-1]
+    total_expense = expense_factor[None, :] * cumulative_expense[-1]
+    net_cash_flow = total_income - total_expense
+
+    pair_income = np.repeat(income_factor, len(expense_factor))
+    pair_expense = np.tile(expense_factor, len(income_factor))
+    pairs = max(1, SCENARIO_GRID_CHUNK_CELLS // len(income))
+    lowest_balance = np.empty(len(pair_income))
+    for start in range(0, len(pair_income), pairs):
+        stop = start + pairs
+        balances = (pair_income[start:stop, None] * cumulative_income
+                    - pair_expense[start:stop, None] * cumulative_expense)
+        lowest_balance[start:stop] = balances.min(axis=-1)
+    lowest_balance = lowest_balance.reshape(net_cash_flow.shape)
+
+    adjusted_rate = (1 + interest[None, :]) * (1 + inflation[:, None]) - 1
+    face_value = net_cash_flow[:, :, None, None] / (1 + adjusted_rate)
+
+    shape = face_value.shape
+    income_index, expense_index, inflation_index, interest_index = (index.ravel() for index in np.indices(shape))
+    return [
+        {
+            'income_adjustment': income_adjustments[i],
+            'expense_adjustment': expense_adjustments[j],
+            'inflation_rate': inflation_rates[k],
+            'interest_rate': interest_rates[m],
+            'total_income': round(total_in, 2),
+            'total_expense': round(total_out, 2),
+            'net_cash_flow': round(net, 2),
+            'lowest_balance': round(lowest, 2),
+            'face_value': round(value, 2),
+        }
+        for i, j, k, m, total_in, total_out, net, lowest, value in zip(
+            income_index.tolist(), expense_index.tolist(), inflation_index.tolist(), interest_index.tolist(),
+            total_income[income_index, 0].tolist(), total_expense[0, expense_index].tolist(),
+            net_cash_flow[income_index, expense_index].tolist(),
+            lowest_balance[income_index, expense_index].tolist(), face_value.ravel().tolist())
+    ]
+
+
 def calculate_remaining_useful_life_years(asset):
     current_year = date.today().year
     years_used = current_year - asset.date_acquired
@@ -425,16 +554,222 @@ def calculate_remaining_useful_life_months(asset):
     return remaining_years * 12
 
 
+ASSET_REGISTER_FIELDS = ('id', 'name', 'asset_types', 'amount', 'residual_value', 'useful_life', 'date_acquired',
+                         'valuation_method', 'is_appreciating', 'appreciation_rate', 'depreciation_rate',
+                         'annual_maintenance_cost', 'current_value')
+ASSET_REGISTER_NUMERIC_FIELDS = ('amount', 'residual_value', 'useful_life', 'date_acquired', 'appreciation_rate',
+                                 'depreciation_rate', 'annual_maintenance_cost', 'current_value')
+SCHEDULE_PERIODS_PER_YEAR = {'yearly': 1, 'monthly': 12}
+MAX_SCHEDULE_PERIODS = 1200
+
+
+def load_asset_register(rows):
+    """Column arrays for asset rows given in ``ASSET_REGISTER_FIELDS`` order."""
+    columns = dict(zip(ASSET_REGISTER_FIELDS, zip(*rows))) if rows else {field: () for field in ASSET_REGISTER_FIELDS}
+    register = {
+        'id': np.array(columns['id'], dtype=np.int64),
+        'name': list(columns['name']),
+        'asset_types': np.array(columns['asset_types'], dtype=object),
+        'valuation_method': np.array(columns['valuation_method'], dtype=object),
+        'is_appreciating': np.array(columns['is_appreciating'], dtype=bool),
+    }
+    for field in ASSET_REGISTER_NUMERIC_FIELDS:
+        register[field] = np.array(columns[field], dtype=float)
+    return register
+
+
+def get_asset_register(assets):
+    return load_asset_register(list(assets.values_list(*ASSET_REGISTER_FIELDS)))
+
+
+def get_asset_years_in_service(register, as_of):
+    """Fractional years between the start of each asset's acquisition year and ``as_of``."""
+    acquired = register['date_acquired'].astype('int64') - 1970
+    acquired_on = acquired.astype('datetime64[Y]').astype('datetime64[D]')
+    elapsed_days = (np.datetime64(as_of, 'D') - acquired_on).astype(float)
+    return np.maximum(elapsed_days / 365.25, 0)
+
+
+def calculate_book_values(register, elapsed_years):
+    """Book value of every asset in ``register`` after ``elapsed_years``.
+
+    ``elapsed_years`` is broadcast against a column per asset, so a (periods,)
+    array yields a full (assets, periods) schedule and a (assets, 1) array
+    yields one value per asset. Assets are valued in vectorized groups by
+    valuation method. Units-of-Production has no recorded usage to work from,
+    so it assumes even usage over the useful life (same as Straight-Line).
+    """
+    cost = register['amount'][:, None]
+    residual_value = register['residual_value'][:, None]
+    useful_life = np.maximum(register['useful_life'], 1)[:, None]
+    appreciation_rate = register['appreciation_rate'][:, None] / 100
+    elapsed = np.maximum(np.broadcast_to(elapsed_years, np.broadcast_shapes(
+        np.shape(elapsed_years), (len(register['id']), 1))), 0)
+
+    book_values = np.empty(elapsed.shape)
+    in_life = np.minimum(elapsed, useful_life)
+    depreciable = cost - residual_value
+    methods = register['valuation_method']
+    appreciating = register['is_appreciating'] | (methods == 'Appreciation')
+
+    groups = {
+        'linear': ~appreciating & np.isin(methods, ['Straight-Line', 'Units-of-Production']),
+        'declining': ~appreciating & (methods == 'Declining-Balance'),
+        'double_declining': ~appreciating & (methods == 'Double-Declining-Balance'),
+        'sum_of_years': ~appreciating & (methods == 'Sum-of-the-Years-Digits'),
+        'appreciation': appreciating,
+    }
+    groups['linear'] |= ~np.logical_or.reduce(list(groups.values()))
+
+    for group, mask in groups.items():
+        if not mask.any():
+            continue
+        c, r, life, t, t_life = cost[mask], residual_value[mask], useful_life[mask], elapsed[mask], in_life[mask]
+
+        if group == 'linear':
+            values = c - depreciable[mask] * t_life / life
+        elif group == 'sum_of_years':
+            values = c - depreciable[mask] * t_life * (2 * life - t_life + 1) / (life * (life + 1))
+        elif group == 'appreciation':
+            values = c * (1 + appreciation_rate[mask]) ** t
+        else:
+            if group == 'double_declining':
+                rate = 2 / life
+            else:
+                # The fixed rate that brings cost down to residual value over the useful life.
+                rate = np.where(r > 0, 1 - (np.maximum(r, 0) / np.where(c > 0, c, 1)) ** (1 / life), 1.5 / life)
+            values = c * (1 - np.minimum(rate, 1)) ** t_life
+            values = np.where(t >= life, r, np.maximum(values, r))
+
+        book_values[mask] = values
+
+    return book_values
+
+
+def generate_depreciation_schedules(register, frequency='yearly', periods=None):
+    periods_per_year = SCHEDULE_PERIODS_PER_YEAR[frequency]
+    if periods is None:
+        longest_life = register['useful_life'].max() if len(register['id']) else 0
+        periods = min(int(longest_life * periods_per_year), MAX_SCHEDULE_PERIODS)
+
+    elapsed_years = np.arange(periods + 1) / periods_per_year
+    book_values = np.round(calculate_book_values(register, elapsed_years), 2)
+
+    return [
+        {
+            'id': int(register['id'][index]),
+            'name': register['name'][index],
+            'valuation_method': register['valuation_method'][index],
+            'date_acquired': int(register['date_acquired'][index]),
+            'book_values': book_values[index].tolist(),
+        }
+        for index in range(len(register['id']))
+    ]
+
+
+def get_single_asset_register(asset):
+    return load_asset_register([tuple(getattr(asset, field) for field in ASSET_REGISTER_FIELDS)])
+
+
+def calculate_total_book_value(assets, as_of):
+    """Current book value of ``assets`` as of a date, in total and per asset type."""
+    register = get_asset_register(assets)
+    elapsed_years = get_asset_years_in_service(register, as_of)[:, None]
+    book_values = calculate_book_values(register, elapsed_years)[:, 0]
+    book_values = np.where(register['date_acquired'] <= as_of.year, book_values, 0)
+
+    type_names, type_index = np.unique(register['asset_types'].astype(str), return_inverse=True)
+    totals_by_type = np.bincount(type_index, weights=book_values, minlength=len(type_names))
+
+    return {
+        'total': Decimal(f"{book_values.sum():.2f}"),
+        'by_asset_type': {name: Decimal(f"{total:.2f}") for name, total in zip(type_names, totals_by_type)},
+    }
+
+
+RATE_RECALCULATION_BATCH_SIZE = 500
+
+
+def derive_asset_rates(register, interest_rate, inflation_rate, today=None):
+    """Vectorized form of the rate derivation in ``Asset.save``.
+
+    Returns one rate (in percent) per asset: the appreciation rate for
+    appreciating assets and the depreciation rate otherwise. Assets whose
+    method has no formula keep their current depreciation rate.
+    """
+    today = today or date.today()
+    adjusted_rate = (1 + interest_rate) * (1 + inflation_rate) - 1
+
+    amount = register['amount']
+    residual_value = register['residual_value']
+    useful_life = register['useful_life']
+    methods = register['valuation_method']
+    depreciable = amount - residual_value
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        years_held = today.year - register['date_acquired']
+        appreciation = np.where(years_held > 0,
+                                (register['current_value'] - amount) / amount * 100 + adjusted_rate * 100, 3.0)
+
+        sum_of_years = useful_life * (useful_life + 1) / 2
+        depreciation = np.select(
+            [methods == 'Straight-Line', methods == 'Declining-Balance', methods == 'Units-of-Production',
+             methods == 'Sum-of-the-Years-Digits', methods == 'Double-Declining-Balance'],
+            [(depreciable / useful_life / amount + adjusted_rate) * 100,
+             ((1 - (residual_value / amount) ** useful_life) + adjusted_rate) * 100,
+             (depreciable / useful_life + adjusted_rate) * 100,
+             (depreciable * (useful_life / sum_of_years) + adjusted_rate) * 100,
+             (2 / useful_life + adjusted_rate) * 100],
+            default=register['depreciation_rate'])
+
+        return np.where(register['is_appreciating'], appreciation, depreciation)
+
+
+def recalculate_asset_rates(business, assumption):
+    """Re-derive the rates of every asset whose rates came from the macro assumptions.
+
+    Assets with user-supplied rates are left alone. Returns the number of assets updated.
+    """
+    register = get_asset_register(Asset.objects.filter(business=business, rates_derived=True))
+    rates = derive_asset_rates(register, float(assumption.interest_rate), float(assumption.inflation_rate))
+    rates = np.round(rates, 2)
+
+    appreciating, depreciating = [], []
+    for asset_id, rate, is_appreciating in zip(register['id'].tolist(), rates.tolist(),
+                                               register['is_appreciating'].tolist()):
+        if not np.isfinite(rate):
+            continue
+        rate = Decimal(f"{rate:.2f}")
+        monthly_rate = (rate / 12).quantize(Decimal('0.01'))
+        if is_appreciating:
+            appreciating.append(Asset(id=asset_id, appreciation_rate=rate, yearly_appreciation_rate=rate,
+                                      monthly_appreciation_rate=monthly_rate))
+        else:
+            depreciating.append(Asset(id=asset_id, depreciation_rate=rate, yearly_depreciation_rate=rate,
+                                      monthly_depreciation_rate=monthly_rate))
+
+    with transaction.atomic():
+        Asset.objects.bulk_update(appreciating, ['appreciation_rate', 'yearly_appreciation_rate',
+                                                 'monthly_appreciation_rate'],
+                                  batch_size=RATE_RECALCULATION_BATCH_SIZE)
+        Asset.objects.bulk_update(depreciating, ['depreciation_rate', 'yearly_depreciation_rate',
+                                                 'monthly_depreciation_rate'],
+                                  batch_size=RATE_RECALCULATION_BATCH_SIZE)
+        record_changes(Asset, Asset.objects.filter(id__in=[asset.id for asset in appreciating + depreciating]),
+                       'updated')
+        bump_data_version_on_commit(business.id)
+
+    return len(appreciating) + len(depreciating)
+
+
 def calculate_remaining_residual_value(asset):
+    # Appreciating assets are reported at their recorded current value, not a compounded projection of cost.
     if asset.is_appreciating:
         return float(asset.current_value)
-    else:
-        remaining_life_years = calculate_remaining_useful_life_years(asset)
-        depreciation_per_year = (float(asset.amount) - float(asset.residual_value)) / asset.useful_life
-        remaining_value = max(
-            float(asset.amount) - (depreciation_per_year * (asset.useful_life - remaining_life_years)),
-            float(asset.residual_value))
-        return remaining_value
+
+    register = get_single_asset_register(asset)
+    elapsed_years = get_asset_years_in_service(register, date.today())[:, None]
+    return round(float(calculate_book_values(register, elapsed_years)[0, 0]), 2)
 
 
 def generate_depreciation_warning(asset):
@@ -462,7 +797,17 @@ def get_valuation_method_explanation(method):
     return explanations.get(method, 'No explanation available for this valuation method.')
 
 
-def generate_asset_project_simulations(asset, num_simulations=1000, risk_tolerance="moderate"):
+SIMULATION_PERCENTILES = [5, 25, 75, 95]
+HISTORICAL_RATE_SAMPLES = 5
+ADAPTIVE_BATCH_SIZE = 1000
+ADAPTIVE_MIN_BATCHES = 4
+
+
+def generate_asset_project_simulations(asset, num_simulations=1000, risk_tolerance="moderate", years=5, seed=None,
+                                       adaptive=False, tolerance=0.005, max_simulations=100000):
+    rng = np.random.default_rng(seed)
+
+    amount = float(asset.amount)
     annual_maintenance_cost = float(asset.annual_maintenance_cost)
     residual_value = float(asset.residual_value)
     is_appreciating = asset.is_appreciating
@@ -470,54 +815,83 @@ def generate_asset_project_simulations(asset, num_simulations=1000, risk_toleran
     depreciation_rate = float(asset.depreciation_rate) / 100
 
     if not depreciation_rate and not is_appreciating:
-        depreciation_rate = (float(asset.amount) - float(asset.residual_value)) / (
-                float(asset.amount) * asset.useful_life)
+        depreciation_rate = (amount - residual_value) / (amount * asset.useful_life)
 
-    historical_rates = []
-    for year in range(1, 6):
-        if is_appreciating:
-            rate = np.random.normal(appreciation_rate, appreciation_rate * 0.1)
+    expected_rate = appreciation_rate if is_appreciating else -depreciation_rate
+    year_index = np.arange(1, years + 1)
+
+    def simulate(size):
+        # One row per simulation, one column per year of the horizon.
+        market_fluctuation = rng.normal(0, market_volatility, size=(size, years))
+        future_values = amount * (1 + expected_rate + market_fluctuation) ** year_index
+        if not is_appreciating:
+            future_values = np.maximum(future_values, residual_value)
+        return future_values - annual_maintenance_cost * year_index
+
+    with timed('model'):
+        historical_rates = rng.normal(expected_rate, abs(expected_rate) * 0.1, size=HISTORICAL_RATE_SAMPLES)
+        market_volatility = np.std(historical_rates)
+
+        if adaptive:
+            future_values = simulate_until_converged(simulate, tolerance, max_simulations)
         else:
-            rate = np.random.normal(depreciation_rate, depreciation_rate * 0.1)
-        historical_rates.append(rate)
-    market_volatility = np.std(historical_rates)
-
-    future_values_all_years = []
-
-    for year in range(1, 6):
-        future_values_year = []
-        for _ in range(num_simulations):
-            market_fluctuation = np.random.normal(loc=0, scale=market_volatility)
-            if is_appreciating:
-                future_value = float(asset.amount) * (1 + appreciation_rate + market_fluctuation) ** year
-            else:
-                future_value = max(float(asset.amount) * (1 - depreciation_rate + market_fluctuation) ** year,
-                                   residual_value)
-            future_value -= annual_maintenance_cost * year
-            future_values_year.append(float(future_value))
+            future_values = simulate(num_simulations)
+
+    return summarize_simulated_values(future_values)
+
+
+def simulate_until_converged(simulate, tolerance, max_simulations, batch_size=ADAPTIVE_BATCH_SIZE):
+    """Draw batches from ``simulate`` until the reported percentiles are stable.
 
-        future_values_all_years.append(future_values_year)
+    The standard error of each percentile is estimated from the spread of the
+    per-batch percentiles (batch means). Sampling stops once every standard
+    error is within ``tolerance`` of the mean simulated value for its year, or
+    when ``max_simulations`` have been drawn.
+    """
+    batches = []
+    batch_percentiles = []
+    running_total = 0
+    drawn = 0
 
-    mean_future_values = [np.mean(values) for values in future_values_all_years]
-    std_dev_future_values = [np.std(values) for values in future_values_all_years]
-    percentile_5 = [np.percentile(values, 5) for values in future_values_all_years]
-    percentile_25 = [np.percentile(values, 25) for values in future_values_all_years]
-    percentile_75 = [np.percentile(values, 75) for values in future_values_all_years]
-    percentile_95 = [np.percentile(values, 95) for values in future_values_all_years]
+    while drawn < max_simulations:
+        batch = simulate(min(batch_size, max_simulations - drawn))
+        batches.append(batch)
+        batch_percentiles.append(np.percentile(batch, SIMULATION_PERCENTILES, axis=0))
+        running_total += batch.sum(axis=0)
+        drawn += len(batch)
+
+        if len(batches) >= ADAPTIVE_MIN_BATCHES:
+            estimates = np.stack(batch_percentiles)
+            standard_error = estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates))
+            scale = np.maximum(np.abs(running_total / drawn), np.finfo(float).eps)
+            if np.all(standard_error <= tolerance * scale):
+                break
+
+    return np.concatenate(batches)
+
+
+def summarize_simulated_values(future_values):
+    """Turn a (num_simulations, years) array of simulated values into per-year scenario rows."""
+    with timed('model'):
+        mean_future_values = future_values.mean(axis=0)
+        std_dev_future_values = future_values.std(axis=0)
+        percentile_5, percentile_25, percentile_75, percentile_95 = np.percentile(
+            future_values, SIMULATION_PERCENTILES, axis=0)
 
     scenarios = []
-    for year in range(5):
+    for year in range(future_values.shape[1]):
         scenario = {
             'year': year + 1,
-            'mean_value': round(mean_future_values[year], 2),
-            'std_dev': round(std_dev_future_values[year], 2),
-            'percentile_25': round(percentile_25[year], 2),
-            'percentile_75': round(percentile_75[year], 2),
-            'percentile_5': round(percentile_5[year], 2),
-            'percentile_95': round(percentile_95[year], 2),
-            'best_case': round(percentile_95[year], 2),
-            'worst_case': round(percentile_5[year], 2),
-            'most_likely': round(mean_future_values[year], 2)
+            'mean_value': round(float(mean_future_values[year]), 2),
+            'std_dev': round(float(std_dev_future_values[year]), 2),
+            'percentile_25': round(float(percentile_25[year]), 2),
+            'percentile_75': round(float(percentile_75[year]), 2),
+            'percentile_5': round(float(percentile_5[year]), 2),
+            'percentile_95': round(float(percentile_95[year]), 2),
+            'best_case': round(float(percentile_95[year]), 2),
+            'worst_case': round(float(percentile_5[year]), 2),
+            'most_likely': round(float(mean_future_values[year]), 2),
+            'num_simulations': future_values.shape[0]
         }
 
         scenarios.append(scenario)
@@ -525,6 +899,93 @@ def generate_asset_project_simulations(asset, num_simulations=1000, risk_toleran
     return scenarios
 
 
+PORTFOLIO_CHUNK_ELEMENTS = 4_000_000
+
+
+def generate_portfolio_simulations(business, num_simulations=1000, years=5, correlation=0.0, seed=None):
+    register = get_asset_register(Asset.objects.filter(business=business))
+    asset_count = len(register['id'])
+
+    if not asset_count:
+        raise ValueError("No asset data found for the business.")
+
+    rng = np.random.default_rng(seed)
+
+    with timed('model'):
+        type_names, type_index = np.unique(register['asset_types'].astype(str), return_inverse=True)
+        amount = register['amount']
+        residual_value = register['residual_value']
+        useful_life = register['useful_life']
+        annual_maintenance_cost = register['annual_maintenance_cost']
+        is_appreciating = register['is_appreciating']
+        appreciation_rate = register['appreciation_rate'] / 100
+        depreciation_rate = register['depreciation_rate'] / 100
+
+        straight_line_rate = np.divide(amount - residual_value, amount * useful_life,
+                                       out=np.zeros_like(amount), where=amount * useful_life != 0)
+        depreciation_rate = np.where((depreciation_rate == 0) & ~is_appreciating, straight_line_rate,
+                                     depreciation_rate)
+        expected_rate = np.where(is_appreciating, appreciation_rate, -depreciation_rate)
+        volatility = np.abs(expected_rate) * 0.1
+        year_index = np.arange(1, years + 1)[:, None]
+        floor = np.where(is_appreciating, -np.inf, residual_value)
+        maintenance = annual_maintenance_cost * year_index
+
+        # Each asset type gets one market shock per simulation and year; types share
+        # a common factor so their shocks have the requested pairwise correlation.
+        common_weight = np.sqrt(correlation)
+        type_weight = np.sqrt(1 - correlation)
+
+        totals = np.empty((num_simulations, years))
+        chunk_size = max(1, PORTFOLIO_CHUNK_ELEMENTS // (years * asset_count))
+        for start in range(0, num_simulations, chunk_size):
+            size = min(chunk_size, num_simulations - start)
+            common_shock = rng.standard_normal((size, years, 1))
+            type_shock = common_weight * common_shock + type_weight * rng.standard_normal(
+                (size, years, len(type_names)))
+            market_fluctuation = type_shock[:, :, type_index] * volatility
+
+            future_values = amount * (1 + expected_rate + market_fluctuation) ** year_index
+            future_values = np.maximum(future_values, floor) - maintenance
+            totals[start:start + size] = future_values.sum(axis=2)
+
+    return {
+        'asset_count': asset_count,
+        'asset_types': type_names.tolist(),
+        'scenarios': summarize_simulated_values(totals),
+    }
+
+
+SIMULATION_CACHE_TIMEOUT = 60 * 60
+
+
+def get_asset_version(asset):
+    """Fingerprint of the asset fields the simulation depends on, so edits invalidate cached runs."""
+    fields = (asset.amount, asset.annual_maintenance_cost, asset.residual_value, asset.is_appreciating,
+              asset.appreciation_rate, asset.depreciation_rate, asset.useful_life)
+    return hashlib.sha1(repr(tuple(float(value) for value in fields)).encode()).hexdigest()[:16]
+
+
+def get_asset_scenarios(asset, risk_tolerance="moderate", num_simulations=1000, years=5, seed=None,
+                        adaptive=False, tolerance=0.005, max_simulations=100000):
+    # Without an explicit seed the asset id is used, so every endpoint reading
+    # the same asset sees the same simulation run.
+    if seed is None:
+        seed = asset.pk
+
+    sample_size = f"adaptive-{tolerance}-{max_simulations}" if adaptive else num_simulations
+    cache_key = (f"asset-scenarios:{asset.pk}:{get_asset_version(asset)}:{risk_tolerance}:"
+                 f"{sample_size}:{years}:{seed}")
+    scenarios = cache.get(cache_key)
+    if scenarios is None:
+        scenarios = generate_asset_project_simulations(asset, num_simulations=num_simulations,
+                                                       risk_tolerance=risk_tolerance, years=years, seed=seed,
+                                                       adaptive=adaptive, tolerance=tolerance,
+                                                       max_simulations=max_simulations)
+        cache.set(cache_key, scenarios, SIMULATION_CACHE_TIMEOUT)
+    return scenarios
+
+
 def generate_asset_report(asset, year, scenarios, risk_tolerance="moderate"):
     scenario = next((s for s in scenarios if s['year'] == year), None)
     if not scenario:
@@ -588,7 +1049,8 @@ def get_comprehensive_breakdown(asset):
         'remaining_useful_life_months': calculate_remaining_useful_life_months(asset),
         'remaining_residual_value': calculate_remaining_residual_value(asset),
         'valuation_method_explanation': get_valuation_method_explanation(asset.valuation_method),
-        'depreciation_warning': generate_depreciation_warning(asset)}
+        'depreciation_warning': generate_depreciation_warning(asset),
+        'depreciation_schedule': generate_depreciation_schedules(get_single_asset_register(asset))[0]['book_values']}
     return detailed_info
 
 
@@ -628,17 +1090,77 @@ def calculate_total_assets(asset_queryset):
     return total_assets
 
 
-def calculate_interest_accrual(liability):
-    interest_rate = Decimal(liability.interest_rate)
-    amount = Decimal(liability.amount)
-    days_since_incurred = (date.today() - liability.date_incurred).days
-    interest_accrued = amount * interest_rate * days_since_incurred / 365
-    return interest_accrued
+def calculate_interest_accrual(liability, as_of=None):
+    """Posted interest plus the simple interest accrued since the last posting."""
+    as_of = as_of or date.today()
+    accrued_since = liability.last_accrual_date or liability.date_incurred
+    pending = calculate_accrued_interest([liability.amount], [liability.interest_rate], [accrued_since], as_of)[0]
+    return Decimal(liability.accrued_interest) + Decimal(str(pending))
+
+
+ACCRUAL_BATCH_SIZE = 1000
+
+
+def post_interest_accruals(as_of=None, business=None):
+    """Post the interest accrued since the last posting for every liability, up to ``as_of``.
+
+    Only the days since each liability's last posting are computed, for a
+    whole batch at a time, and every posting is recorded as an
+    ``InterestAccrual`` entry. Returns the number of entries written.
+    """
+    as_of = as_of or date.today()
+    liabilities = Liability.objects.filter(date_incurred__lt=as_of).filter(
+        Q(last_accrual_date__isnull=True) | Q(last_accrual_date__lt=as_of))
+    if business is not None:
+        liabilities = liabilities.filter(business=business)
+
+    posted = 0
+    liability_ids = list(liabilities.order_by('id').values_list('id', flat=True))
+    for offset in range(0, len(liability_ids), ACCRUAL_BATCH_SIZE):
+        batch_ids = liability_ids[offset:offset + ACCRUAL_BATCH_SIZE]
+        with transaction.atomic():
+            # Re-read under lock so a concurrent run cannot post the same days twice.
+            batch = list(Liability.objects.select_for_update().filter(id__in=batch_ids).filter(
+                Q(last_accrual_date__isnull=True) | Q(last_accrual_date__lt=as_of)))
+            if not batch:
+                continue
+
+            period_starts = [liability.last_accrual_date or liability.date_incurred for liability in batch]
+            interest = calculate_accrued_interest([liability.amount for liability in batch],
+                                                  [liability.interest_rate for liability in batch],
+                                                  period_starts, as_of)
+            entries = []
+            for liability, period_start, amount in zip(batch, period_starts, interest.tolist()):
+                amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+                entries.append(InterestAccrual(
+                    liability=liability,
+                    business_id=liability.business_id,
+                    period_start=period_start,
+                    period_end=as_of,
+                    days=(as_of - period_start).days,
+                    interest_rate=liability.interest_rate,
+                    amount=amount,
+                ))
+
+            InterestAccrual.objects.bulk_create(entries)
+            posted_interest = InterestAccrual.objects.filter(liability=OuterRef('pk'), period_end=as_of).values(
+                'liability').annotate(total=Sum('amount')).values('total')
+            Liability.objects.filter(id__in=[liability.id for liability in batch]).update(
+                accrued_interest=F('accrued_interest') + Subquery(posted_interest),
+                last_accrual_date=as_of,
+            )
+            record_changes(Liability, Liability.objects.filter(id__in=[liability.id for liability in batch]),
+                           'updated')
+            for business_id in {liability.business_id for liability in batch}:
+                bump_data_version_on_commit(business_id)
+            posted += len(entries)
+
+    return posted
 
 
 def track_loan_payments(liability):
-    total_paid = PaymentSchedule.objects.filter(liability=liability).aggregate(Sum('installment_amount'))[
-                     'installment_amount__sum'] or Decimal('0.00')
+    total_paid = PaymentSchedule.objects.filter(liability=liability).aggregate(Sum('paid_amount'))[
+                     'paid_amount__sum'] or Decimal('0.00')
     remaining_balance = Decimal(liability.amount) - total_paid
     return total_paid, remaining_balance
 
@@ -663,41 +1185,835 @@ def get_payment_frequency_in_days(payment_frequency):
     return payment_frequencies.get(payment_frequency, 0)
 
 
-def generate_payment_schedule(principal, interest_rate, term_years, payment_frequency, start_date):
-    term_months = term_years * 12
-    monthly_interest_rate = Decimal(interest_rate) / Decimal('100') / Decimal('12')
-    monthly_payment = principal * monthly_interest_rate / (1 - (1 + monthly_interest_rate) ** -term_months)
+PAYMENTS_PER_YEAR = {
+    'Weekly': 52,
+    'Bi-Weekly': 26,
+    'Monthly': 12,
+    'Quarterly': 4,
+    'Semi-Annually': 2,
+    'Annually': 1,
+}
+PAYMENT_INTERVAL_DAYS = {'Weekly': 7, 'Bi-Weekly': 14}
+PAYMENT_INTERVAL_MONTHS = {'Monthly': 1, 'Quarterly': 3, 'Semi-Annually': 6, 'Annually': 12}
+
+
+def calculate_periodic_payment(principal, interest_rate, num_payments, payments_per_year):
+    """Level payment per period for an annual ``interest_rate`` in percent. Broadcasts over arrays."""
+    periodic_rate = np.asarray(interest_rate, dtype=float) / 100 / payments_per_year
+    num_payments = np.asarray(num_payments, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(periodic_rate > 0,
+                        principal * periodic_rate / (1 - (1 + periodic_rate) ** -num_payments),
+                        principal / num_payments)
+
+
+def amortize_cents(principal_cents, periodic_rate, payment_cents, num_payments, keep_balances=False):
+    """Walk level-payment loans installment by installment in integer cents, in lockstep over arrays of loans.
+
+    Each period's interest is rounded to the cent and added to the balance
+    before the payment comes off. The installment that can clear the balance
+    pays exactly what is left, so the final installment absorbs the rounding
+    of the level payment, and no installment follows it. Returns the number of
+    installments made and the total paid per loan, plus the balance before
+    each installment when ``keep_balances`` is set.
+    """
+    periodic_rate, payment_cents, num_payments = np.broadcast_arrays(
+        np.asarray(periodic_rate, dtype=float), np.asarray(payment_cents, dtype=np.int64),
+        np.asarray(num_payments, dtype=np.int64))
+    balance = np.full(periodic_rate.shape, principal_cents, dtype=np.int64)
+    installments = np.zeros(balance.shape, dtype=np.int64)
+    total_paid = np.zeros(balance.shape, dtype=np.int64)
+    balances = [balance]
+
+    for period in range(int(num_payments.max(initial=0))):
+        due = balance + np.rint(balance * periodic_rate).astype(np.int64)
+        clears = (period + 1 >= num_payments) | (due <= payment_cents)
+        installments += balance > 0
+        total_paid += np.where(clears, due, payment_cents)
+        balance = np.where(clears, 0, due - payment_cents)
+        if keep_balances:
+            balances.append(balance)
+        if not balance.any():
+            break
+
+    if keep_balances:
+        return installments, total_paid, np.stack(balances)
+    return installments, total_paid
+
+
+@lru_cache(maxsize=256)
+def get_amortization_balances(principal_cents, periodic_rate, payment_cents, num_payments):
+    """Balance before each installment of one loan, ending with the zero balance after the last one."""
+    installments, _, balances = amortize_cents(principal_cents, periodic_rate, payment_cents, num_payments,
+                                               keep_balances=True)
+    balances = balances[:int(installments) + 1]
+    balances.flags.writeable = False
+    return balances
+
+
+def get_payment_dates(start_date, payment_frequency, indices):
+    """Due dates of the installments at ``indices`` (0 is the first installment, due on ``start_date``)."""
+    indices = np.asarray(indices, dtype=np.int64)
+    if payment_frequency in PAYMENT_INTERVAL_DAYS:
+        return np.datetime64(start_date, 'D') + indices * PAYMENT_INTERVAL_DAYS[payment_frequency]
+
+    months = np.datetime64(start_date, 'M') + indices * PAYMENT_INTERVAL_MONTHS[payment_frequency]
+    last_day_of_month = (months + 1).astype('datetime64[D]') - 1
+    return np.minimum(months.astype('datetime64[D]') + (start_date.day - 1), last_day_of_month)
+
+
+def compute_amortization_schedule(principal, interest_rate, term_years, payment_frequency, start_date,
+                                  start=0, stop=None):
+    """Amortization schedule in integer cents for installments ``start`` to ``stop``.
+
+    The level payment is rounded to the nearest cent and the balances come
+    from ``amortize_cents``, cached per loan, so any window of the schedule
+    can be produced without walking the earlier installments again. Principal
+    is the difference between consecutive balances and interest is what the
+    period added to the balance, so every row reconciles exactly. If rounding
+    the payment up clears the loan early, ``num_payments`` is the number of
+    installments actually made.
+    """
+    payments_per_year = PAYMENTS_PER_YEAR[payment_frequency]
+    scheduled_payments = int(term_years * payments_per_year)
+    principal_cents = int((Decimal(principal) * 100).to_integral_value())
+    periodic_rate = float(interest_rate) / 100 / payments_per_year
+    payment_cents = max(int(np.rint(calculate_periodic_payment(principal_cents, interest_rate, scheduled_payments,
+                                                               payments_per_year))), 1)
+
+    balances = get_amortization_balances(principal_cents, periodic_rate, payment_cents, scheduled_payments)
+    num_payments = len(balances) - 1
+    stop = num_payments if stop is None else min(stop, num_payments)
+    start = max(0, min(start, stop))
+
+    indices = np.arange(start, stop)
+    opening_balance = balances[start:stop]
+    closing_balance = balances[start + 1:stop + 1]
+    interest = np.rint(opening_balance * periodic_rate).astype(np.int64)
+    principal_paid = opening_balance - closing_balance
 
-    payment_frequencies = {
-        'Weekly': 52,
-        'Bi-Weekly': 26,
-        'Monthly': 12,
-        'Quarterly': 4,
-        'Semi-Annually': 2,
-        'Annually': 1,
+    return {
+        'number': indices + 1,
+        'date': get_payment_dates(start_date, payment_frequency, indices),
+        'principal': principal_paid,
+        'interest': interest,
+        'payment': principal_paid + interest,
+        'remaining_principal': closing_balance,
+        'num_payments': num_payments,
+        'level_payment': payment_cents,
     }
-    num_payments_per_year = payment_frequencies[payment_frequency]
-    payment_interval_days = 365 / num_payments_per_year
-
-    payments = []
-    remaining_principal = principal
-    total_payments = int(term_years * num_payments_per_year)
-
-    for i in range(total_payments):
-        periodic_interest_rate = monthly_interest_rate * 12 / num_payments_per_year
-        interest_for_period = remaining_principal * periodic_interest_rate
-        principal_for_period = monthly_payment - interest_for_period
-        payment_date = start_date + timedelta(days=int(i * payment_interval_days))
-        remaining_principal -= principal_for_period
-        payments.append({
+
+
+def cents_to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def generate_payment_schedule(principal, interest_rate, term_years, payment_frequency, start_date):
+    schedule = compute_amortization_schedule(principal, interest_rate, term_years, payment_frequency, start_date)
+
+    return [
+        {
             'date': payment_date,
-            'principal': principal,
-            'interest': interest_for_period,
-            'monthly_payment': monthly_payment,
-            'remaining_principal': remaining_principal
+            'principal': cents_to_decimal(principal_paid),
+            'interest': cents_to_decimal(interest),
+            'monthly_payment': cents_to_decimal(payment),
+            'remaining_principal': cents_to_decimal(remaining_principal)
+        }
+        for payment_date, principal_paid, interest, payment, remaining_principal in zip(
+            schedule['date'].astype(date), schedule['principal'].tolist(), schedule['interest'].tolist(),
+            schedule['payment'].tolist(), schedule['remaining_principal'].tolist())
+    ]
+
+
+def get_installment_window(start_date, payment_frequency, num_payments, window_start, window_end):
+    """Range of installment indices that can fall between ``window_start`` and ``window_end``."""
+    if payment_frequency in PAYMENT_INTERVAL_DAYS:
+        interval = PAYMENT_INTERVAL_DAYS[payment_frequency]
+        first = (window_start - start_date).days // interval
+        last = (window_end - start_date).days // interval
+    else:
+        interval = PAYMENT_INTERVAL_MONTHS[payment_frequency]
+        first = ((window_start.year - start_date.year) * 12 + window_start.month - start_date.month) // interval - 1
+        last = ((window_end.year - start_date.year) * 12 + window_end.month - start_date.month) // interval
+    return max(first, 0), min(max(last + 1, 0), num_payments)
+
+
+def serialize_installment(installment):
+    return {
+        'number': installment.number,
+        'date': installment.date,
+        'principal': installment.principal,
+        'interest': installment.interest,
+        'monthly_payment': installment.monthly_payment,
+        'remaining_principal': installment.remaining_principal,
+        'status': installment.status,
+        'paid_on': installment.paid_on,
+    }
+
+
+def build_schedule_installments(schedule, start=0, stop=None):
+    """Unsaved ``PaymentInstallment`` rows for the installments ``start`` to ``stop`` of a schedule."""
+    amortization = compute_amortization_schedule(schedule.principal, schedule.interest_rate, schedule.term_years,
+                                                 schedule.payment_frequency, schedule.start_date, start, stop)
+    return [
+        PaymentInstallment(
+            schedule=schedule,
+            business_id=schedule.business_id,
+            number=number,
+            date=payment_date,
+            principal=cents_to_decimal(principal_paid),
+            interest=cents_to_decimal(interest),
+            monthly_payment=cents_to_decimal(payment),
+            remaining_principal=cents_to_decimal(remaining_principal),
+        )
+        for number, payment_date, principal_paid, interest, payment, remaining_principal in zip(
+            amortization['number'].tolist(), amortization['date'].astype(date), amortization['principal'].tolist(),
+            amortization['interest'].tolist(), amortization['payment'].tolist(),
+            amortization['remaining_principal'].tolist())
+    ]
+
+
+def materialize_installments(schedule, window_start, window_end):
+    """Installments of ``schedule`` due between two dates.
+
+    Compact schedules only store the rows that were paid or adjusted; every
+    other installment in the window is generated from the schedule parameters.
+    """
+    if not schedule.is_compact:
+        installments = schedule.installments.filter(date__gte=window_start, date__lte=window_end).order_by('date')
+        return [serialize_installment(installment) for installment in installments]
+
+    num_payments = schedule.term_years * PAYMENTS_PER_YEAR[schedule.payment_frequency]
+    start, stop = get_installment_window(schedule.start_date, schedule.payment_frequency, num_payments,
+                                         window_start, window_end)
+    generated = build_schedule_installments(schedule, start, stop)
+    stored = {
+        installment.number: installment
+        for installment in schedule.installments.filter(number__gt=start, number__lte=stop)
+    }
+
+    return [
+        serialize_installment(stored.get(installment.number, installment))
+        for installment in generated
+        if window_start <= stored.get(installment.number, installment).date <= window_end
+    ]
+
+
+def persist_installment(schedule, number, **changes):
+    """Store installment ``number`` of ``schedule`` with ``changes`` applied, creating the row if needed."""
+    installment = schedule.installments.filter(number=number).first()
+    if installment is None:
+        if not schedule.is_compact:
+            raise ValueError("No installment matches the given number.")
+        generated = build_schedule_installments(schedule, number - 1, number)
+        if not generated:
+            raise ValueError("No installment matches the given number.")
+        installment = generated[0]
+
+    for field, value in changes.items():
+        setattr(installment, field, value)
+    try:
+        with transaction.atomic():
+            installment.save()
+    except IntegrityError:
+        # Another request stored this installment first; apply the changes to its row instead.
+        installment = schedule.installments.get(number=number)
+        for field, value in changes.items():
+            setattr(installment, field, value)
+        installment.save()
+    return installment
+
+
+def evaluate_refinance_grid(balance, interest_rates, term_years, payment_frequencies, start_date):
+    """Payment, total interest and payoff date for every (rate, term, frequency) refinancing option.
+
+    The whole grid is walked at once by ``amortize_cents`` over a (rates,
+    terms, frequencies) array, with the same payment rounding and payoff
+    logic as ``compute_amortization_schedule``, so every option's totals
+    match the schedule it would generate.
+    """
+    balance_cents = int((Decimal(balance) * 100).to_integral_value())
+    rates = np.asarray([float(rate) for rate in interest_rates])[:, None, None]
+    terms = np.asarray(term_years, dtype=np.int64)[None, :, None]
+    payments_per_year = np.asarray([PAYMENTS_PER_YEAR[frequency] for frequency in payment_frequencies])[None, None, :]
+
+    scheduled_payments = terms * payments_per_year
+    periodic_rate = rates / 100 / payments_per_year
+    payment = np.maximum(np.rint(calculate_periodic_payment(balance_cents, rates, scheduled_payments,
+                                                            payments_per_year)), 1).astype(np.int64)
+    num_payments, total_paid = amortize_cents(balance_cents, periodic_rate, payment, scheduled_payments)
+    total_interest = total_paid - balance_cents
+
+    payoff_dates = np.stack([
+        get_payment_dates(start_date, frequency, num_payments[..., k] - 1)
+        for k, frequency in enumerate(payment_frequencies)
+    ], axis=-1)
+
+    shape = total_paid.shape
+    rate_index, term_index, frequency_index = (index.ravel() for index in np.indices(shape))
+    return [
+        {
+            'interest_rate': interest_rates[i],
+            'term_years': term_years[j],
+            'payment_frequency': payment_frequencies[k],
+            'num_payments': count,
+            'periodic_payment': cents_to_decimal(periodic),
+            'total_interest': cents_to_decimal(interest),
+            'total_paid': cents_to_decimal(paid),
+            'payoff_date': payoff_date,
+        }
+        for i, j, k, count, periodic, interest, paid, payoff_date in zip(
+            rate_index.tolist(), term_index.tolist(), frequency_index.tolist(), num_payments.ravel().tolist(),
+            np.broadcast_to(payment, shape).ravel().tolist(), total_interest.ravel().tolist(),
+            total_paid.ravel().tolist(), payoff_dates.ravel().astype(date))
+    ]
+
+
+def calculate_accrued_interest(amounts, interest_rates, start_dates, as_of):
+    """Simple interest accrued up to ``as_of`` for arrays of amounts and annual rates in percent."""
+    amounts = np.asarray(amounts, dtype=float)
+    rates = np.asarray(interest_rates, dtype=float) / 100
+    days = (np.datetime64(as_of, 'D') - np.asarray(start_dates, dtype='datetime64[D]')).astype(np.int64)
+    return np.round(amounts * rates * np.maximum(days, 0) / 365, 2)
+
+
+def get_next_compact_installments(schedules, as_of):
+    """Next unpaid installment due on or after ``as_of`` for each compact schedule, keyed by liability.
+
+    The first installment due by ``as_of`` comes from the schedule dates and
+    is then moved past any consecutively paid installments, so only the
+    resulting installment is generated however many were prepaid.
+    """
+    paid = {}
+    for schedule_id, number in PaymentInstallment.objects.filter(schedule__in=schedules,
+                                                                 status='Paid').values_list('schedule_id', 'number'):
+        paid.setdefault(schedule_id, set()).add(number)
+
+    next_installments = {}
+    for schedule in schedules:
+        num_payments = schedule.term_years * PAYMENTS_PER_YEAR[schedule.payment_frequency]
+        start, _ = get_installment_window(schedule.start_date, schedule.payment_frequency, num_payments, as_of, as_of)
+        dates = get_payment_dates(schedule.start_date, schedule.payment_frequency, np.arange(start, start + 4))
+        number = start + int(np.searchsorted(dates, np.datetime64(as_of, 'D'))) + 1
+        paid_numbers = paid.get(schedule.id, set())
+        while number in paid_numbers:
+            number += 1
+
+        generated = build_schedule_installments(schedule, number - 1, number)
+        if not generated:
+            continue
+        installment = generated[0]
+        current = next_installments.get(schedule.liability_id)
+        if current is None or installment.date < current.date:
+            next_installments[schedule.liability_id] = installment
+    return next_installments
+
+
+def to_cents(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def get_debt_portfolio(business, as_of=None):
+    """Outstanding balance, accrued interest, next installment and collateral coverage of every liability.
+
+    Per-liability figures come from annotated subqueries, so the number of
+    queries does not grow with the number of liabilities.
+    """
+    as_of = as_of or date.today()
+    money = DecimalField(max_digits=20, decimal_places=2)
+
+    next_installment = PaymentInstallment.objects.filter(
+        schedule__liability=OuterRef('pk'), schedule__is_compact=False, date__gte=as_of
+    ).exclude(status='Paid').order_by('date')
+    total_paid = PaymentSchedule.objects.filter(liability=OuterRef('pk')).values('liability').annotate(
+        total=Sum('paid_amount')).values('total')
+    collateral_value = Collateral.objects.filter(liability=OuterRef('pk')).values('liability').annotate(
+        total=Sum('value')).values('total')
+
+    liabilities = list(
+        Liability.objects.filter(business=business).select_related('creditor').annotate(
+            outstanding_balance=ExpressionWrapper(F('amount') - F('paid_amount'), output_field=money),
+            total_paid=Coalesce(Subquery(total_paid, output_field=money), 0, output_field=money),
+            collateral_value=Coalesce(Subquery(collateral_value, output_field=money), 0, output_field=money),
+            next_due_date=Subquery(next_installment.values('date')[:1]),
+            next_due_amount=Subquery(next_installment.values('monthly_payment')[:1]),
+        ).order_by('due_date', 'id')
+    )
+    if not liabilities:
+        return {'as_of': as_of, 'liabilities': [], 'totals': {}}
+
+    compact_schedules = list(PaymentSchedule.objects.filter(liability__business=business, is_compact=True))
+    compact_installments = get_next_compact_installments(compact_schedules, as_of) if compact_schedules else {}
+
+    pending_interest = calculate_accrued_interest(
+        [liability.amount for liability in liabilities],
+        [liability.interest_rate for liability in liabilities],
+        [liability.last_accrual_date or liability.date_incurred for liability in liabilities],
+        as_of,
+    )
+
+    rows = []
+    for liability, interest in zip(liabilities, pending_interest.tolist()):
+        next_due_date, next_due_amount = liability.next_due_date, liability.next_due_amount
+        compact = compact_installments.get(liability.id)
+        if compact is not None and (next_due_date is None or compact.date < next_due_date):
+            next_due_date, next_due_amount = compact.date, compact.monthly_payment
+
+        outstanding_balance = to_cents(liability.outstanding_balance)
+        rows.append({
+            'id': liability.id,
+            'name': liability.name,
+            'liability_type': liability.liability_type,
+            'creditor': liability.creditor.name if liability.creditor else None,
+            'amount': liability.amount,
+            'paid_amount': liability.paid_amount,
+            'outstanding_balance': outstanding_balance,
+            'total_paid': to_cents(liability.total_paid),
+            'accrued_interest': liability.accrued_interest + Decimal(str(interest)),
+            'due_date': liability.due_date,
+            'next_installment': {
+                'date': next_due_date,
+                'amount': to_cents(next_due_amount) if next_due_amount is not None else None,
+            } if next_due_date else None,
+            'collateral_value': to_cents(liability.collateral_value),
+            'collateral_coverage': round(liability.collateral_value / outstanding_balance, 4)
+            if outstanding_balance > 0 else None,
         })
 
-    return payments
+    totals = {
+        'amount': sum(row['amount'] for row in rows),
+        'outstanding_balance': sum(row['outstanding_balance'] for row in rows),
+        'accrued_interest': sum(row['accrued_interest'] for row in rows),
+        'collateral_value': sum(row['collateral_value'] for row in rows),
+    }
+    return {'as_of': as_of, 'liabilities': rows, 'totals': totals}
+
+
+# Position of each kind of due item within a day, part of the calendar sort key.
+UPCOMING_INSTALLMENT, UPCOMING_SCHEDULED, UPCOMING_PAYABLE = 0, 1, 2
+
+
+def encode_cursor(key):
+    due_date, kind, ref, number = key
+    payload = json.dumps([due_date.isoformat(), kind, ref, number])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        due_date, kind, ref, number = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(due_date), int(kind), int(ref), int(number)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_filter(date_field, kind, after):
+    """Rows of ``kind`` that sort after the ``after`` key, ordered by (date, kind, id)."""
+    if after is None:
+        return Q()
+    after_date, after_kind, after_ref, _ = after
+    later = Q(**{f'{date_field}__gt': after_date})
+    if kind > after_kind:
+        return later | Q(**{date_field: after_date})
+    if kind == after_kind:
+        return later | Q(**{date_field: after_date, 'id__gt': after_ref})
+    return later
+
+
+def get_upcoming_payments(business, start_date, end_date, limit=100, cursor=None):
+    """Unpaid installments and pending payables due between two dates, grouped by day.
+
+    Results are ordered by (date, kind, id) and paginated with a keyset
+    cursor, so each page is a bounded range scan on the (business, date)
+    indexes. Installments of compact schedules are generated for the window.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    window_start = max(start_date, after[0]) if after else start_date
+
+    installments = PaymentInstallment.objects.filter(
+        business=business, date__gte=window_start, date__lte=end_date
+    ).exclude(status='Paid').filter(keyset_filter('date', UPCOMING_INSTALLMENT, after)).select_related(
+        'schedule__liability').order_by('date', 'id')[:limit + 1]
+    payables = AccountsPayable.objects.filter(
+        business=business, status='Pending', due_date__gte=window_start, due_date__lte=end_date
+    ).filter(keyset_filter('due_date', UPCOMING_PAYABLE, after)).select_related('supplier').order_by(
+        'due_date', 'id')[:limit + 1]
+
+    items = [
+        ((installment.date, UPCOMING_INSTALLMENT, installment.id, installment.number or 0), {
+            'type': 'installment',
+            'id': installment.id,
+            'schedule': installment.schedule_id,
+            'number': installment.number,
+            'liability': installment.schedule.liability.name,
+            'amount': installment.monthly_payment,
+            'status': installment.status,
+        })
+        for installment in installments
+    ]
+    items += [
+        ((payable.due_date, UPCOMING_PAYABLE, payable.id, 0), {
+            'type': 'payable',
+            'id': payable.id,
+            'supplier': payable.supplier.name,
+            'amount': payable.amount_due,
+            'status': payable.status,
+        })
+        for payable in payables
+    ]
+
+    compact_schedules = list(PaymentSchedule.objects.filter(
+        business=business, is_compact=True, start_date__lte=end_date, end_date__gte=window_start
+    ).select_related('liability'))
+    if compact_schedules:
+        stored = {}
+        for schedule_id, number in PaymentInstallment.objects.filter(
+                schedule__in=compact_schedules, date__gte=window_start, date__lte=end_date
+        ).values_list('schedule_id', 'number'):
+            stored.setdefault(schedule_id, set()).add(number)
+        for schedule in compact_schedules:
+            for installment in materialize_compact_window(schedule, window_start, end_date, limit + 1, after,
+                                                          stored.get(schedule.id, frozenset())):
+                items.append(((installment.date, UPCOMING_SCHEDULED, schedule.id, installment.number), {
+                    'type': 'installment',
+                    'id': None,
+                    'schedule': schedule.id,
+                    'number': installment.number,
+                    'liability': schedule.liability.name,
+                    'amount': installment.monthly_payment,
+                    'status': installment.status,
+                }))
+
+    items.sort(key=lambda item: item[0])
+    page, has_more = items[:limit], len(items) > limit
+
+    days = {}
+    for key, item in page:
+        day = days.setdefault(key[0], {'date': key[0], 'total': Decimal('0.00'), 'items': []})
+        day['total'] += item['amount'] or 0
+        day['items'].append(item)
+
+    return {
+        'days': list(days.values()),
+        'next_cursor': encode_cursor(page[-1][0]) if has_more else None,
+    }
+
+
+def materialize_compact_window(schedule, window_start, window_end, limit, after=None, stored=frozenset()):
+    """Up to ``limit`` generated installments of a compact schedule that sort after the ``after`` key.
+
+    Installments whose number is in ``stored`` have a row of their own and are
+    skipped without counting towards ``limit``.
+    """
+    num_payments = schedule.term_years * PAYMENTS_PER_YEAR[schedule.payment_frequency]
+    start, stop = get_installment_window(schedule.start_date, schedule.payment_frequency, num_payments,
+                                         window_start, window_end)
+    installments = [
+        installment
+        for installment in build_schedule_installments(schedule, start, min(stop, start + limit + len(stored) + 1))
+        if installment.number not in stored and window_start <= installment.date <= window_end
+        and (after is None or (installment.date, UPCOMING_SCHEDULED, schedule.id, installment.number) > after)
+    ]
+    return installments[:limit]
+
+
+def record_liability_payments(business, payments):
+    """Apply a batch of payments to the liabilities of ``business``.
+
+    Validation and installment generation happen before the transaction; the
+    transaction itself only issues ``F()`` increments and status updates, so
+    row locks are held briefly and concurrent payments never overwrite each
+    other. The updates are conditional, so the whole batch is rejected if it
+    would pay more than a liability's outstanding balance or pay an
+    installment that is already paid, even when a concurrent batch got there
+    first. Returns the updated paid and outstanding amounts per liability.
+    """
+    liability_ids = {payment['liability'] for payment in payments}
+    found = set(Liability.objects.filter(business=business, id__in=liability_ids).values_list('id', flat=True))
+    if found != liability_ids:
+        raise ValueError(f"No liability matches the ids {sorted(liability_ids - found)}.")
+
+    schedule_ids = {payment['schedule'] for payment in payments if payment.get('schedule')}
+    schedules = {schedule.id: schedule for schedule in PaymentSchedule.objects.filter(business=business,
+                                                                                      id__in=schedule_ids)}
+    paid_by_liability, paid_by_schedule, paid_installments = {}, {}, {}
+    for payment in payments:
+        liability_id, amount = payment['liability'], payment['amount']
+        paid_by_liability[liability_id] = paid_by_liability.get(liability_id, Decimal('0.00')) + amount
+
+        schedule_id = payment.get('schedule')
+        if not schedule_id:
+            continue
+        schedule = schedules.get(schedule_id)
+        if schedule is None or schedule.liability_id != liability_id:
+            raise ValueError(f"No payment schedule {schedule_id} matches liability {liability_id}.")
+        paid_by_schedule[schedule_id] = paid_by_schedule.get(schedule_id, Decimal('0.00')) + amount
+        number = payment.get('installment_number')
+        if number:
+            if (schedule_id, number) in paid_installments:
+                raise ValueError(f"Installment {number} of payment schedule {schedule_id} is paid twice.")
+            paid_installments[(schedule_id, number)] = payment['paid_on']
+
+    stored = {}
+    if paid_installments:
+        numbers = Q()
+        for schedule_id, number in paid_installments:
+            numbers |= Q(schedule_id=schedule_id, number=number)
+        stored = {(schedule_id, number): status for schedule_id, number, status in
+                  PaymentInstallment.objects.filter(numbers).values_list('schedule_id', 'number', 'status')}
+        for (schedule_id, number), status in sorted(stored.items()):
+            if status == 'Paid':
+                raise ValueError(f"Installment {number} of payment schedule {schedule_id} is already paid.")
+
+    new_installments = []
+    for schedule_id, number in paid_installments:
+        if (schedule_id, number) in stored:
+            continue
+        schedule = schedules[schedule_id]
+        generated = build_schedule_installments(schedule, number - 1, number) if schedule.is_compact else []
+        if not generated:
+            raise ValueError(f"No installment {number} matches payment schedule {schedule_id}.")
+        new_installments.extend(generated)
+
+    with transaction.atomic():
+        # Rows are updated in id order so concurrent batches lock them in the same order.
+        for liability_id, amount in sorted(paid_by_liability.items()):
+            if not Liability.objects.filter(id=liability_id, paid_amount__lte=F('amount') - amount).update(
+                    paid_amount=F('paid_amount') + amount):
+                raise ValueError(f"Payments of {amount} exceed the outstanding balance of liability {liability_id}.")
+        for schedule_id, amount in sorted(paid_by_schedule.items()):
+            PaymentSchedule.objects.filter(id=schedule_id).update(paid_amount=F('paid_amount') + amount)
+        # Compact installments are stored unpaid first. A concurrent batch may have stored the same one
+        # since ``stored`` was read; the unique (schedule, number) constraint skips it, and the update
+        # below marks it paid unless that batch already did.
+        PaymentInstallment.objects.bulk_create(new_installments, ignore_conflicts=True)
+        for (schedule_id, number), paid_on in sorted(paid_installments.items()):
+            if not PaymentInstallment.objects.filter(schedule_id=schedule_id, number=number).exclude(
+                    status='Paid').update(status='Paid', paid_on=paid_on):
+                raise ValueError(f"Installment {number} of payment schedule {schedule_id} is already paid.")
+        record_changes(Liability, Liability.objects.filter(id__in=liability_ids), 'updated')
+        bump_data_version_on_commit(business.id)
+
+    return [
+        {
+            'id': liability.id,
+            'paid_amount': liability.paid_amount,
+            'outstanding_balance': liability.get_outstanding_balance(),
+        }
+        for liability in Liability.objects.filter(id__in=liability_ids).order_by('id')
+    ]
+
+
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_ERROR_LIMIT = 1000
+IMPORT_CATEGORY_FIELDS = {Income: 'source', Expense: 'expense_category'}
+# Amounts are parsed as float64 and kept in integer cents, which is exact below 2 ** 53 cents.
+MAX_TRANSACTION_AMOUNT = 10 ** 13
+
+
+def validate_transaction_rows(model, df):
+    """Validate imported rows column by column. Returns cleaned rows and the errors of each failing row."""
+    category_field = IMPORT_CATEGORY_FIELDS[model]
+    category_choices = [choice for choice, _ in model._meta.get_field(category_field).choices]
+    currency_choices = [choice for choice, _ in CURRENCY_CHOICES]
+
+    for column in ('amount', 'description', 'currency', category_field):
+        if column not in df.columns:
+            df[column] = None
+    if 'date' not in df.columns:
+        df['date'] = None
+
+    amount = pd.to_numeric(df['amount'].astype(str).str.strip(), errors='coerce')
+    missing_amount = ~np.isfinite(amount)
+    known_amount = amount.where(~missing_amount, 1)
+    description = df['description'].fillna('').astype(str).str.strip()
+    category = df[category_field].fillna('').astype(str).str.strip()
+    currency = df['currency'].fillna('').astype(str).str.strip()
+    missing_date = df['date'].isna() | (df['date'].astype(str).str.strip() == '')
+    dates = pd.to_datetime(df['date'].where(~missing_date), errors='coerce', utc=True, format='mixed')
+    dates = dates.where(~missing_date, pd.Timestamp(timezone.now())).dt.floor('us')
+
+    checks = [
+        (missing_amount, "A valid amount is required."),
+        (known_amount <= 0, "Amount must be greater than zero."),
+        (known_amount.abs() >= MAX_TRANSACTION_AMOUNT, "Amount is too large."),
+        (description == '', "Description is required."),
+        (description.str.len() > 255, "Description must be at most 255 characters."),
+        (~category.isin(category_choices), f"{category_field} must be one of {', '.join(category_choices)}."),
+        (~currency.isin(currency_choices), f"currency must be one of {', '.join(currency_choices)}."),
+        (dates.isna(), "Invalid date."),
+    ]
+    failed = np.zeros(len(df), dtype=bool)
+    for mask, _ in checks:
+        failed |= mask.to_numpy(dtype=bool, na_value=False)
+
+    cleaned = pd.DataFrame({
+        'row': np.arange(1, len(df) + 1),
+        'date': dates,
+        'amount_cents': np.rint(known_amount.clip(-MAX_TRANSACTION_AMOUNT, MAX_TRANSACTION_AMOUNT) * 100).astype(np.int64),
+        'category': category,
+        'description': description,
+        'currency': currency,
+    })
+    duplicate = cleaned.duplicated(subset=['date', 'category', 'description']).to_numpy() & ~failed
+    checks.append((pd.Series(duplicate), "Duplicate of an earlier row in this import."))
+
+    errors = {}
+    for mask, message in checks:
+        for row in cleaned['row'][mask.to_numpy(dtype=bool, na_value=False)].tolist():
+            errors.setdefault(row, []).append(message)
+
+    return cleaned[~(failed | duplicate)], errors
+
+
+def import_transactions(business, user, model, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Bulk import ``Income`` or ``Expense`` rows for ``business``.
+
+    Rows are validated column-wise, checked against the model's
+    ``unique_together`` key with one query per chunk, and inserted with
+    chunked ``bulk_create`` in one transaction. Failing rows are reported
+    by their 1-based position and do not stop the rest of the import.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    category_field = IMPORT_CATEGORY_FIELDS[model]
+
+    with timed('pandas'):
+        valid, errors = validate_transaction_rows(model, df)
+
+    imported = 0
+    with transaction.atomic():
+        for offset in range(0, len(valid), chunk_size):
+            chunk = valid.iloc[offset:offset + chunk_size]
+            dates = chunk['date'].dt.to_pydatetime().tolist()
+            keys = list(zip(dates, chunk['category'].tolist(), chunk['description'].tolist()))
+
+            existing = set(model.objects.filter(
+                user=user, date__in=set(dates), description__in=set(chunk['description'].tolist())
+            ).values_list('date', category_field, 'description'))
+
+            records = []
+            for row, key, amount, currency in zip(chunk['row'].tolist(), keys, chunk['amount_cents'].tolist(),
+                                                  chunk['currency'].tolist()):
+                if key in existing:
+                    errors.setdefault(row, []).append(f"{model.__name__} already exists.")
+                    continue
+                date_value, category, description = key
+                records.append(model(**{
+                    'date': date_value,
+                    'amount': cents_to_decimal(amount),
+                    category_field: category,
+                    'description': description,
+                    'currency': currency,
+                    'user_id': user.id,
+                    'business_id': business.id,
+                }))
+
+            model.objects.bulk_create(records, batch_size=1000)
+            record_changes(model, records, 'created')
+            imported += len(records)
+        bump_data_version_on_commit(business.id)
+
+    return {
+        'received': len(df),
+        'imported': imported,
+        'failed': len(errors),
+        'errors': [{'row': row, 'errors': errors[row]} for row in sorted(errors)[:IMPORT_ERROR_LIMIT]],
+    }
+
+
+def read_import_json(request):
+    """The parsed JSON body of an import request, read from the request stream up to IMPORT_MAX_BODY_SIZE.
+
+    Reading the stream directly rather than through ``request.data`` lets
+    the import endpoints accept bodies above DATA_UPLOAD_MAX_MEMORY_SIZE,
+    which every other endpoint keeps.
+    """
+    if int(request.META.get('CONTENT_LENGTH') or 0) > settings.IMPORT_MAX_BODY_SIZE:
+        raise ValueError(f"Import bodies are limited to {settings.IMPORT_MAX_BODY_SIZE} bytes; upload a CSV file.")
+    body = request.stream.read(settings.IMPORT_MAX_BODY_SIZE + 1) if request.stream is not None else b''
+    if len(body) > settings.IMPORT_MAX_BODY_SIZE:
+        raise ValueError(f"Import bodies are limited to {settings.IMPORT_MAX_BODY_SIZE} bytes; upload a CSV file.")
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        raise ValueError("The request body is not valid JSON.")
+
+
+def read_import_rows(request):
+    """Rows of a bulk import: an uploaded CSV ``file``, a JSON array, or a JSON object with ``rows``."""
+    if request.content_type.startswith('multipart/'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError("Provide a CSV file or a JSON array of rows.")
+        try:
+            return pd.read_csv(upload, dtype=str, keep_default_na=False)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Could not read CSV file: {e}")
+
+    data = read_import_json(request)
+    rows = data.get('rows') if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Provide a CSV file or a JSON array of rows.")
+    return rows
+
+
+CHANGE_TRACKED_MODELS = (Income, Expense, Asset, Liability, AccountsReceivable, AccountsPayable)
+CHANGE_FEED_PAGE_SIZE = 500
+
+
+def snapshot(instance):
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def record_changes(model, instances, action):
+    """Append change log entries for ``instances`` in the current transaction.
+
+    The business rows are locked before the entries are inserted and stay
+    locked until the transaction commits, so a business's entries become
+    visible in sequence order: a client that has read up to a sequence number
+    never misses a change committed later with a lower one. Inside a
+    transaction the entries commit or roll back together with the change.
+    """
+    entries = [
+        ChangeLogEntry(
+            business_id=instance.business_id,
+            model=model._meta.model_name,
+            object_id=instance.pk,
+            action=action,
+            data=None if action == 'deleted' else snapshot(instance),
+        )
+        for instance in instances
+    ]
+    if not entries:
+        return
+
+    business_ids = sorted({entry.business_id for entry in entries})
+    with transaction.atomic():
+        locked = Business.objects.select_for_update(no_key=connection.features.has_select_for_no_key_update)
+        list(locked.filter(id__in=business_ids).order_by('id').values_list('id', flat=True))
+        ChangeLogEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def get_changes(business, since=0, limit=CHANGE_FEED_PAGE_SIZE):
+    entries = list(ChangeLogEntry.objects.filter(business=business, id__gt=since).order_by('id')[:limit + 1])
+    page = entries[:limit]
+    return {
+        'changes': [
+            {
+                'sequence': entry.id,
+                'model': entry.model,
+                'object_id': entry.object_id,
+                'action': entry.action,
+                'data': entry.data,
+                'changed_at': entry.changed_at,
+            }
+            for entry in page
+        ],
+        'next_cursor': page[-1].id if page else since,
+        'has_more': len(entries) > limit,
+    }
+
+
 # def generate_income_statement(business, year=None, start_date=None, end_date=None, period='monthly'):
 #     if year:
 #         income = Income.objects.filter(business=business, date__year=year)
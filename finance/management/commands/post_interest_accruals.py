@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.helpers import post_interest_accruals
+from users.models import Business
+
+
+class Command(BaseCommand):
+    help = "Post the interest accrued on every liability since its last posting."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help="Accrue up to this date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--business', type=int, help="Only post accruals for this business id.")
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options['as_of']) if options['as_of'] else date.today()
+        except ValueError:
+            raise CommandError("Invalid --as-of date. Use YYYY-MM-DD.")
+
+        business = None
+        if options['business'] is not None:
+            try:
+                business = Business.objects.get(id=options['business'])
+            except Business.DoesNotExist:
+                raise CommandError("No business matches the given id.")
+
+        posted = post_interest_accruals(as_of, business)
+        self.stdout.write(self.style.SUCCESS(f"Posted {posted} interest accruals up to {as_of}."))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_asset_rates_derived_macroassumption'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentinstallment',
+            name='number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentinstallment',
+            name='paid_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentinstallment',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Paid', 'Paid'), ('Adjusted', 'Adjusted')], default='Pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='interest_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='is_compact',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='principal',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='term_years',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_schedule_business(apps, schema_editor):
+    PaymentInstallment = apps.get_model('finance', 'PaymentInstallment')
+    PaymentSchedule = apps.get_model('finance', 'PaymentSchedule')
+    PaymentInstallment.objects.update(
+        business=Subquery(PaymentSchedule.objects.filter(id=OuterRef('schedule_id')).values('business')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_paymentinstallment_number_paymentinstallment_paid_on_and_more'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentinstallment',
+            name='business',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='users.business'),
+        ),
+        migrations.RunPython(copy_schedule_business, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='accountspayable',
+            index=models.Index(fields=['business', 'due_date'], name='finance_acc_busines_782886_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentinstallment',
+            index=models.Index(fields=['business', 'date'], name='finance_pay_busines_61636d_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_paymentinstallment_business_and_more'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liability',
+            name='accrued_interest',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='liability',
+            name='last_accrual_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='InterestAccrual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('days', models.PositiveIntegerField()),
+                ('interest_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('posted_at', models.DateTimeField(auto_now_add=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.business')),
+                ('liability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_accruals', to='finance.liability')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['business', 'period_end'], name='finance_int_busines_99c65f_idx')],
+            },
+        ),
+    ]
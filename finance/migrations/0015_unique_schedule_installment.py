@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_installments(apps, schema_editor):
+    # Keep the paid row of a duplicated installment if there is one, otherwise the oldest.
+    PaymentInstallment = apps.get_model('finance', 'PaymentInstallment')
+    duplicates = (PaymentInstallment.objects.filter(number__isnull=False).values('schedule_id', 'number')
+                  .annotate(rows=Count('id'), first_id=Min('id')).filter(rows__gt=1))
+    for duplicate in duplicates:
+        rows = PaymentInstallment.objects.filter(schedule_id=duplicate['schedule_id'], number=duplicate['number'])
+        paid = rows.filter(status='Paid').order_by('id').values_list('id', flat=True).first()
+        rows.exclude(id=paid or duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0014_changelogentry'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_installments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='paymentinstallment',
+            constraint=models.UniqueConstraint(fields=('schedule', 'number'), name='unique_schedule_installment'),
+        ),
+    ]
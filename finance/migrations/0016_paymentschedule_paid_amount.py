@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_paid_totals(apps, schema_editor):
+    # Payments used to be added to installment_amount; carry what was recorded there over.
+    PaymentSchedule = apps.get_model('finance', 'PaymentSchedule')
+    PaymentSchedule.objects.filter(installment_amount__isnull=False).update(paid_amount=F('installment_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0015_unique_schedule_installment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.RunPython(copy_paid_totals, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ from datetime import date
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 from users.models import Business
 
@@ -14,6 +16,9 @@ CURRENCY_CHOICES = [
     ('YEN', 'Yen'),
 ]
 
+DEFAULT_INTEREST_RATE = Decimal('0.3480')
+DEFAULT_INFLATION_RATE = Decimal('0.275')
+
 
 class Income(models.Model):
     SOURCE_CHOICES = [
@@ -23,7 +28,7 @@ class Income(models.Model):
         ('Other', 'O'),
     ]
 
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now)
     amount = models.DecimalField(max_digits=20, decimal_places=2)
     source = models.CharField(max_length=15, choices=SOURCE_CHOICES)
     description = models.CharField(max_length=255)
@@ -50,7 +55,7 @@ class Expense(models.Model):
         ('Miscellaneous', 'miscellaneous')
     ]
 
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now)
     amount = models.DecimalField(max_digits=20, decimal_places=2)
     expense_category = models.CharField(max_length=50, choices=EXPENSE_CHOICES)
     description = models.CharField(max_length=255)
@@ -103,6 +108,7 @@ class Asset(models.Model):
     monthly_appreciation_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     yearly_appreciation_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     annual_maintenance_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    rates_derived = models.BooleanField(default=False)
     business = models.ForeignKey(Business, on_delete=models.CASCADE, default=1)
 
     def __str__(self):
@@ -116,8 +122,7 @@ class Asset(models.Model):
         date_acquired = Decimal(str(self.date_acquired))
         useful_life_int = int(str(self.useful_life))
 
-        current_interest_rate = Decimal(0.3480)
-        current_inflation_rate = Decimal(0.275)
+        current_interest_rate, current_inflation_rate = MacroAssumption.current_rates(self.business_id)
 
         adjusted_rate = (1 + current_interest_rate) * (1 + current_inflation_rate) - 1
 
@@ -128,6 +133,7 @@ class Asset(models.Model):
                     self.appreciation_rate = ((current_value - amount) / amount) * 100 + adjusted_rate * 100
                 else:
                     self.appreciation_rate = Decimal(3.0)
+                self.rates_derived = True
             self.yearly_appreciation_rate = self.appreciation_rate
             self.monthly_appreciation_rate = self.appreciation_rate / 12
         else:
@@ -144,9 +150,12 @@ class Asset(models.Model):
                                 useful_life / total_years)) + adjusted_rate) * 100
                 elif self.valuation_method == 'Double-Declining-Balance':
                     self.depreciation_rate = ((2 / useful_life) + adjusted_rate) * 100
+                self.rates_derived = bool(self.depreciation_rate)
             self.yearly_depreciation_rate = self.depreciation_rate
             self.monthly_depreciation_rate = self.depreciation_rate / 12
 
+        super().save(*args, **kwargs)
+
 
 class Liability(models.Model):
     LIABILITY_TYPE = [
@@ -168,6 +177,8 @@ class Liability(models.Model):
     collateral = models.OneToOneField('Collateral', on_delete=models.SET_NULL, blank=True, null=True,
                                       related_name='liability_collateral')
     business = models.ForeignKey(Business, on_delete=models.CASCADE, default=1)
+    accrued_interest = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    last_accrual_date = models.DateField(blank=True, null=True)
 
     def get_outstanding_balance(self):
         amount = Decimal(str(self.amount))
@@ -178,6 +189,23 @@ class Liability(models.Model):
         return f"{self.name} - {self.amount} ({self.liability_type})"
 
 
+class InterestAccrual(models.Model):
+    liability = models.ForeignKey('Liability', on_delete=models.CASCADE, related_name='interest_accruals')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    days = models.PositiveIntegerField()
+    interest_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+    posted_at = models.DateTimeField(auto_now_add=True)
+    business = models.ForeignKey(Business, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [models.Index(fields=['business', 'period_end'])]
+
+    def __str__(self):
+        return f"Interest of {self.amount} on {self.liability.name} to {self.period_end}"
+
+
 class PaymentSchedule(models.Model):
     liability = models.ForeignKey('Liability', on_delete=models.CASCADE, related_name='payment_schedules')
     payment_frequency = models.CharField(max_length=50, choices=[
@@ -191,6 +219,11 @@ class PaymentSchedule(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(blank=True, null=True)
     installment_amount = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=False)
+    paid_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    principal = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    interest_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    term_years = models.PositiveSmallIntegerField(null=True, blank=True)
+    is_compact = models.BooleanField(default=False)
     business = models.ForeignKey(Business, on_delete=models.CASCADE, default=1)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
@@ -199,12 +232,26 @@ class PaymentSchedule(models.Model):
 
 
 class PaymentInstallment(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Paid', 'Paid'),
+        ('Adjusted', 'Adjusted'),
+    ]
+
     schedule = models.ForeignKey('PaymentSchedule', on_delete=models.CASCADE, related_name='installments')
+    number = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    paid_on = models.DateField(null=True, blank=True)
     date = models.DateField()
     principal = models.DecimalField(max_digits=20, decimal_places=2)
     interest = models.DecimalField(max_digits=20, decimal_places=2)
     monthly_payment = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
     remaining_principal = models.DecimalField(max_digits=20, decimal_places=2)
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, default=1)
+
+    class Meta:
+        indexes = [models.Index(fields=['business', 'date'])]
+        constraints = [models.UniqueConstraint(fields=['schedule', 'number'], name='unique_schedule_installment')]
 
     def __str__(self):
         return f"Installment due on {self.date} for {self.schedule.liability.name}"
@@ -275,6 +322,9 @@ class AccountsPayable(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['business', 'due_date'])]
+
 
 class CashFlowForecast(models.Model):
     date = models.DateField()
@@ -285,3 +335,46 @@ class CashFlowForecast(models.Model):
     updated_at = models.DateField(auto_now=True)
     business = models.ForeignKey(Business, on_delete=models.CASCADE, default=1)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+
+
+class MacroAssumption(models.Model):
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='macro_assumptions')
+    version = models.PositiveIntegerField()
+    interest_rate = models.DecimalField(max_digits=7, decimal_places=4)
+    inflation_rate = models.DecimalField(max_digits=7, decimal_places=4)
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('business', 'version')
+
+    @classmethod
+    def current_rates(cls, business_id):
+        assumption = cls.objects.filter(business_id=business_id).order_by('-version').first()
+        if assumption is None:
+            return DEFAULT_INTEREST_RATE, DEFAULT_INFLATION_RATE
+        return assumption.interest_rate, assumption.inflation_rate
+
+    def __str__(self):
+        return f"Macro assumptions v{self.version} for {self.business}"
+
+
+class ChangeLogEntry(models.Model):
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='change_log')
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['business', 'id'])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {self.action}"
@@ -1,95 +1,63 @@
 from rest_framework import permissions
-from rest_framework_simplejwt.models import TokenUser
-from users.models import User
+from users.identity import get_user_identity
 
 
 class IsOwnerAdminManagerOrReadonly(permissions.BasePermission):
     def has_permission(self, request, view):
-        if isinstance(request.user, TokenUser):
-            print(f"TokenUser detected: {request.user}")
-            user = User.objects.get(id=request.user.id)
-            print(f"Converted TokenUser to User: {user.username}")
-        else:
-            user = request.user
-
-        user_groups = list(user.groups.values_list('name', flat=True))
-        print(f"Checking general permission for user: {user}, groups: {user_groups}, method: {request.method}")
+        identity = get_user_identity(request.user)
+        if identity is None:
+            return False
 
         if request.method in permissions.SAFE_METHODS:
-            return user and user.is_authenticated
+            return True
 
+        user_groups = identity['groups']
         has_permission = (
-                user and user.is_authenticated and
-                (
-                        'Admin' in user_groups or
-                        'Owner' in user_groups or
-                        'Manager' in user_groups or
-                        user.is_superuser
-                )
+                'Admin' in user_groups or
+                'Owner' in user_groups or
+                'Manager' in user_groups or
+                identity['is_superuser']
         )
 
-        print(f"General permission result for user {user.username}: {has_permission}")
         return has_permission
 
     def has_object_permission(self, request, view, obj):
-        if isinstance(request.user, TokenUser):
-            print(f"TokenUser detected: {request.user}")
-            user = User.objects.get(id=request.user.id)
-            print(f"Converted TokenUser to User: {user.username}")
-        else:
-            user = request.user
-
-        user_groups = list(user.groups.values_list('name', flat=True))
-        print(
-            f"Checking object permission for user: {user}, groups: {user_groups}, obj user: {obj.user}, method: {request.method}")
-
         if request.method in permissions.SAFE_METHODS:
             return True
 
+        identity = get_user_identity(request.user)
+        if identity is None:
+            return False
+
+        user_groups = identity['groups']
         has_obj_permission = (
-                obj.user == user or
+                obj.user_id == identity['id'] or
                 'Admin' in user_groups or
                 'Owner' in user_groups or
                 'Manager' in user_groups or
-                user.is_superuser
+                identity['is_superuser']
         )
-        print(f"Object permission result for user {user.username}: {has_obj_permission}")
 
         return has_obj_permission
 
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        if isinstance(request.user, TokenUser):
-            print(f"TokenUser detected: {request.user}")
-            user = User.objects.get(id=request.user.id)
-            print(f"Converted TokenUser to User: {user.username}")
-        else:
-            user = request.user
-
-        user_groups = list(user.groups.values_list('name', flat=True))
-        print(f"Checking general permission for user: {user}, groups: {user_groups}, method: {request.method}")
-
-        has_permission = user and user.is_authenticated and (
-                'Admin' in user_groups or 'Owner' in user_groups or user.is_superuser
-        )
+        identity = get_user_identity(request.user)
+        if identity is None:
+            return False
+
+        user_groups = identity['groups']
+        has_permission = 'Admin' in user_groups or 'Owner' in user_groups or identity['is_superuser']
 
-        print(f"General permission result for user {user.username}: {has_permission}")
         return has_permission
 
     def has_object_permission(self, request, view, obj):
-        if isinstance(request.user, TokenUser):
-            print(f"TokenUser detected: {request.user}")
-            user = User.objects.get(id=request.user.id)
-            print(f"Converted TokenUser to User: {user.username}")
-        else:
-            user = request.user
-
-        user_groups = list(user.groups.values_list('name', flat=True))
-        print(f"Checking object permission for user: {user}, groups: {user_groups}, obj user: {obj.user}, method: {request.method}")
+        identity = get_user_identity(request.user)
+        if identity is None:
+            return False
 
-        has_obj_permission = 'Admin' in user_groups or 'Owner' in user_groups or user.is_superuser
-        print(f"Object permission result for user {user.username}: {has_obj_permission}")
+        user_groups = identity['groups']
+        has_obj_permission = 'Admin' in user_groups or 'Owner' in user_groups or identity['is_superuser']
 
         return has_obj_permission
-
@@ -1,11 +1,15 @@
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
 
-from .helpers import generate_payment_schedule
+from .helpers import build_schedule_installments, cents_to_decimal, compute_amortization_schedule, record_changes, \
+    MAX_SCHEDULE_PERIODS, PAYMENTS_PER_YEAR, REPORT_LAYOUTS
 from .models import Income, Business, Expense, Asset, Liability, PaymentSchedule, Creditor, Collateral, \
-    PaymentInstallment, Customer, Supplier, AccountsReceivable, AccountsPayable, CashFlowForecast
+    PaymentInstallment, Customer, Supplier, AccountsReceivable, AccountsPayable, CashFlowForecast, MacroAssumption
+from operations.versioning import bump_data_version_on_commit
 from users.models import User
 from rest_framework_simplejwt.models import TokenUser
 
@@ -20,7 +24,6 @@ class BusinessAwareSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user if not isinstance(request.user, TokenUser) else User.objects.get(id=request.user.id)
-        print(f"Resolved User from TokenUser: {user}")
 
         business = getattr(user, 'business', None)
         if business is None:
@@ -33,7 +36,6 @@ class BusinessAwareSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         request = self.context.get('request')
         user = request.user if not isinstance(request.user, TokenUser) else User.objects.get(id=request.user.id)
-        print(f"Resolved User from TokenUser: {user}")
 
         business = getattr(user, 'business', None)
         if business is None:
@@ -52,11 +54,12 @@ class IncomeSerializer(BusinessAwareSerializer):
     class Meta:
         model = Income
         fields = '__all__'
+        # Set on creation; only bulk imports may backdate entries.
+        read_only_fields = ['date']
 
     def validate(self, attrs):
         request = self.context.get('request')
         user = request.user if not isinstance(request.user, TokenUser) else User.objects.get(id=request.user.id)
-        print(f"Resolved User from TokenUser: {user}")
 
         business = getattr(user, 'business', None)
         if not business:
@@ -90,11 +93,12 @@ class ExpenseSerializer(BusinessAwareSerializer):
     class Meta:
         model = Expense
         fields = '__all__'
+        # Set on creation; only bulk imports may backdate entries.
+        read_only_fields = ['date']
 
     def validate(self, attrs):
         request = self.context.get('request')
         user = request.user if not isinstance(request.user, TokenUser) else User.objects.get(id=request.user.id)
-        print(f"Resolved User from TokenUser: {user}")
 
         business = getattr(user, 'business', None)
         if not business:
@@ -134,6 +138,7 @@ class AssetDetailSerializer(BusinessAwareSerializer):
     class Meta:
         model = Asset
         fields = '__all__'
+        read_only_fields = ['rates_derived']
 
     def validate(self, attrs):
         request = self.context.get('request')
@@ -146,6 +151,12 @@ class AssetDetailSerializer(BusinessAwareSerializer):
         attrs['business'] = business
         attrs['user'] = user
 
+        # A rate changed by hand is no longer derived from the macro assumptions.
+        if self.instance is not None and self.instance.rates_derived:
+            for field in ('depreciation_rate', 'appreciation_rate'):
+                if field in attrs and attrs[field] != getattr(self.instance, field):
+                    attrs['rates_derived'] = False
+
         name = attrs.get('name')
         description = attrs.get('description')
 
@@ -163,6 +174,16 @@ class AssetDetailSerializer(BusinessAwareSerializer):
         return attrs
 
 
+class TotalAssetsParamsSerializer(serializers.Serializer):
+    basis = serializers.ChoiceField(choices=['cost', 'book_value'], default='cost')
+    as_of = serializers.DateField(required=False)
+
+
+class DepreciationScheduleParamsSerializer(serializers.Serializer):
+    frequency = serializers.ChoiceField(choices=['yearly', 'monthly'], default='yearly')
+    periods = serializers.IntegerField(required=False, min_value=1, max_value=MAX_SCHEDULE_PERIODS)
+
+
 class ScenarioSerializer(serializers.Serializer):
     year = serializers.IntegerField()
     mean_value = serializers.FloatField()
@@ -174,10 +195,30 @@ class ScenarioSerializer(serializers.Serializer):
     best_case = serializers.FloatField()
     worst_case = serializers.FloatField()
     most_likely = serializers.FloatField()
+    num_simulations = serializers.IntegerField()
 
 
 class RiskToleranceSerializer(serializers.Serializer):
     risk_tolerance = serializers.ChoiceField(choices=['low', 'moderate', 'high'], default='moderate')
+    years = serializers.IntegerField(default=5, min_value=1, max_value=50)
+    num_simulations = serializers.IntegerField(default=1000, min_value=100, max_value=100000)
+    seed = serializers.IntegerField(required=False, min_value=0)
+    adaptive = serializers.BooleanField(default=False)
+    tolerance = serializers.FloatField(default=0.005, min_value=0.0001, max_value=0.1)
+    max_simulations = serializers.IntegerField(default=100000, min_value=1000, max_value=100000)
+
+
+class PortfolioSimulationParamsSerializer(serializers.Serializer):
+    years = serializers.IntegerField(default=5, min_value=1, max_value=50)
+    num_simulations = serializers.IntegerField(default=1000, min_value=100, max_value=100000)
+    correlation = serializers.FloatField(default=0.0, min_value=0.0, max_value=1.0)
+    seed = serializers.IntegerField(required=False, min_value=0)
+
+
+class PortfolioSimulationSerializer(serializers.Serializer):
+    asset_count = serializers.IntegerField()
+    asset_types = serializers.ListField(child=serializers.CharField())
+    scenarios = ScenarioSerializer(many=True)
 
 
 class ExplainScenarioSerializer(serializers.Serializer):
@@ -190,9 +231,13 @@ class StorySerializer(serializers.Serializer):
     story = serializers.CharField()
 
 
-class ScenarioQueryParamsSerializer(serializers.Serializer):
-    year = serializers.IntegerField(default=1, min_value=1, max_value=5)
-    risk_tolerance = serializers.ChoiceField(choices=['low', 'moderate', 'high'], default='moderate')
+class ScenarioQueryParamsSerializer(RiskToleranceSerializer):
+    year = serializers.IntegerField(default=1, min_value=1, max_value=50)
+
+    def validate(self, attrs):
+        if attrs['year'] > attrs['years']:
+            raise serializers.ValidationError({"year": "Year must fall within the simulated horizon."})
+        return attrs
 
 
 class LiabilitySerializer(BusinessAwareSerializer):
@@ -222,16 +267,81 @@ class PaymentScheduleSerializer(BusinessAwareSerializer):
         installment_amount = validated_data.get('installment_amount')
         instance.installment_amount = installment_amount
 
-        liability = instance.liability
-        liability.paid_amount += Decimal(installment_amount)
-        liability.save()
-
-        instance.save()
+        amount = Decimal(installment_amount)
+        with transaction.atomic():
+            liabilities = Liability.objects.filter(id=instance.liability_id)
+            if not liabilities.filter(paid_amount__lte=F('amount') - amount).update(
+                    paid_amount=F('paid_amount') + amount):
+                raise serializers.ValidationError("The payment exceeds the liability's outstanding balance.")
+            record_changes(Liability, liabilities, 'updated')
+            # installment_amount is the level payment; the paid total is only ever incremented in the database.
+            PaymentSchedule.objects.filter(id=instance.id).update(paid_amount=F('paid_amount') + amount)
+            instance.save(update_fields=['installment_amount'])
+        instance.refresh_from_db(fields=['paid_amount'])
         return instance
 
     class Meta:
         model = PaymentSchedule
         fields = '__all__'
+        read_only_fields = ['paid_amount']
+
+
+class InstallmentWindowParamsSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return data
+
+
+class InstallmentUpdateSerializer(serializers.Serializer):
+    number = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=PaymentInstallment.STATUS_CHOICES, required=False)
+    paid_on = serializers.DateField(required=False, allow_null=True)
+    date = serializers.DateField(required=False)
+    principal = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    interest = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    monthly_payment = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    remaining_principal = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+
+
+class RefinanceOptionsSerializer(serializers.Serializer):
+    MAX_GRID_SIZE = 10000
+
+    interest_rates = serializers.ListField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0), allow_empty=False)
+    term_years = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=50), allow_empty=False)
+    payment_frequencies = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(PAYMENTS_PER_YEAR)), allow_empty=False)
+    start_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        grid_size = len(data['interest_rates']) * len(data['term_years']) * len(data['payment_frequencies'])
+        if grid_size > self.MAX_GRID_SIZE:
+            raise serializers.ValidationError(f"A refinancing grid can have at most {self.MAX_GRID_SIZE} options.")
+        return data
+
+
+class RecordPaymentSerializer(serializers.Serializer):
+    liability = serializers.IntegerField(min_value=1)
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2, validators=[validate_positive])
+    schedule = serializers.IntegerField(min_value=1, required=False)
+    installment_number = serializers.IntegerField(min_value=1, required=False)
+    paid_on = serializers.DateField(default=date.today)
+
+    def validate(self, data):
+        if data.get('installment_number') and not data.get('schedule'):
+            raise serializers.ValidationError("installment_number requires a schedule.")
+        return data
+
+
+class RecordPaymentsSerializer(serializers.Serializer):
+    payments = RecordPaymentSerializer(many=True, allow_empty=False, max_length=1000)
 
 
 class CreditorSerializer(BusinessAwareSerializer):
@@ -247,9 +357,9 @@ class CollateralSerializer(BusinessAwareSerializer):
 
 
 class GeneratePaymentScheduleSerializer(serializers.Serializer):
-    principal = serializers.DecimalField(max_digits=20, decimal_places=2)
-    interest_rate = serializers.DecimalField(max_digits=10, decimal_places=2)
-    term_years = serializers.IntegerField()
+    principal = serializers.DecimalField(max_digits=20, decimal_places=2, validators=[validate_positive])
+    interest_rate = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    term_years = serializers.IntegerField(min_value=1, max_value=50)
     payment_frequency = serializers.ChoiceField(choices=[
         ('Weekly', 'Weekly'),
         ('Bi-Weekly', 'Bi-Weekly'),
@@ -260,6 +370,7 @@ class GeneratePaymentScheduleSerializer(serializers.Serializer):
     ])
     start_date = serializers.DateField()
     liability_name = serializers.CharField(max_length=50)
+    compact = serializers.BooleanField(default=False)
 
     def create(self, validated_data):
         principal = validated_data['principal']
@@ -274,59 +385,72 @@ class GeneratePaymentScheduleSerializer(serializers.Serializer):
 
         name = validated_data['liability_name']
 
-        print(f"user: {user}")
-        print(f"name: {name}")
-        print(f"business: {user.business}")
-
         # Check if user has an associated business
         if not user.business:
             raise serializers.ValidationError("User has no associated business.")
 
-        payments = generate_payment_schedule(principal, interest_rate, term_years, payment_frequency, start_date)
-
-        liability, created = Liability.objects.get_or_create(
-            user=user,
-            name=name,
-            defaults={
-                'amount': principal,
-                'interest_rate': interest_rate,
-                'liability_type': 'Current',
-                'business': user.business,
-                'date_incurred': start_date,
-                'due_date': start_date + timedelta(days=term_years * 365),
-                'paid_amount': Decimal('0.00')
-            }
-        )
-
-        print(f"liability: {liability}, created: {created}")
-
-        payment_schedule = PaymentSchedule.objects.create(
-            liability=liability,
-            payment_frequency=payment_frequency,
-            start_date=start_date,
-            end_date=start_date + timedelta(days=term_years * 365),
-            business=user.business,
-            user=user
-        )
-
-        print(f"payment_schedule: {payment_schedule}")
-
-        payment_installments = []
-        for payment in payments:
-            payment_installment = PaymentInstallment(
-                schedule=payment_schedule,
-                date=payment['date'],
-                principal=payment['principal'],
-                interest=payment['interest'],
-                monthly_payment=payment['monthly_payment'],
-                remaining_principal=payment['remaining_principal']
+        amortization = compute_amortization_schedule(principal, interest_rate, term_years, payment_frequency, start_date,
+                                                     stop=0)
+
+        # The schedule and its installments commit together, so the data version is bumped only once both exist.
+        with transaction.atomic():
+            liability, created = Liability.objects.get_or_create(
+                user=user,
+                name=name,
+                defaults={
+                    'amount': principal,
+                    'interest_rate': interest_rate,
+                    'liability_type': 'Current',
+                    'business': user.business,
+                    'date_incurred': start_date,
+                    'due_date': start_date + timedelta(days=term_years * 365),
+                    'paid_amount': Decimal('0.00')
+                }
             )
-            payment_installments.append(payment_installment)
 
-        PaymentInstallment.objects.bulk_create(payment_installments)
+            payment_schedule = PaymentSchedule.objects.create(
+                liability=liability,
+                payment_frequency=payment_frequency,
+                start_date=start_date,
+                end_date=start_date + timedelta(days=term_years * 365),
+                installment_amount=cents_to_decimal(amortization['level_payment']),
+                principal=principal,
+                interest_rate=interest_rate,
+                term_years=term_years,
+                is_compact=validated_data['compact'],
+                business=user.business,
+                user=user
+            )
+            if not payment_schedule.is_compact:
+                payment_installments = build_schedule_installments(payment_schedule)
+                PaymentInstallment.objects.bulk_create(payment_installments)
+                bump_data_version_on_commit(user.business.id)
+
+        schedule_data = {
+            'id': payment_schedule.id,
+            'liability': payment_schedule.liability.id,
+            'payment_frequency': payment_schedule.payment_frequency,
+            'start_date': payment_schedule.start_date,
+            'end_date': payment_schedule.end_date,
+            'installment_amount': str(payment_schedule.installment_amount),
+            'principal': str(payment_schedule.principal),
+            'interest_rate': str(payment_schedule.interest_rate),
+            'term_years': payment_schedule.term_years,
+            'is_compact': payment_schedule.is_compact,
+            'business': payment_schedule.business.id,
+            'user': payment_schedule.user.id
+        }
+
+        # Compact schedules keep only their parameters; installments are generated on request.
+        if payment_schedule.is_compact:
+            return {
+                "schedule": schedule_data,
+                "num_installments": amortization['num_payments']
+            }
 
         installments_data = [
             {
+                'number': installment.number,
                 'date': installment.date,
                 'principal': str(installment.principal),
                 'monthly_payment': installment.monthly_payment,
@@ -336,15 +460,7 @@ class GeneratePaymentScheduleSerializer(serializers.Serializer):
         ]
 
         response_data = {
-            "schedule": {
-                'id': payment_schedule.id,
-                'liability': payment_schedule.liability.id,
-                'payment_frequency': payment_schedule.payment_frequency,
-                'start_date': payment_schedule.start_date,
-                'end_date': payment_schedule.end_date,
-                'business': payment_schedule.business.id,
-                'user': payment_schedule.user.id
-            },
+            "schedule": schedule_data,
             "installments": installments_data
         }
 
@@ -375,6 +491,16 @@ class AccountsPayableSerializer(BusinessAwareSerializer):
         fields = '__all__'
 
 
+class MacroAssumptionSerializer(BusinessAwareSerializer):
+    interest_rate = serializers.DecimalField(max_digits=7, decimal_places=4, min_value=0)
+    inflation_rate = serializers.DecimalField(max_digits=7, decimal_places=4, min_value=-1)
+
+    class Meta:
+        model = MacroAssumption
+        fields = '__all__'
+        read_only_fields = ['business', 'version', 'user']
+
+
 class CashFlowForecastSerializer(BusinessAwareSerializer):
     class Meta:
         model = CashFlowForecast
@@ -405,6 +531,26 @@ class DateRangeSerializer(serializers.Serializer):
     end_date = serializers.DateField(required=True, format='%Y-%m-%d')
 
 
+class ReportLayoutParamsSerializer(serializers.Serializer):
+    layout = serializers.ChoiceField(choices=REPORT_LAYOUTS, default='records')
+
+
+class SeriesParamsSerializer(ReportLayoutParamsSerializer):
+    max_points = serializers.IntegerField(required=False, min_value=3, max_value=100000)
+
+
+class UpcomingPaymentsParamsSerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
+    start_date = serializers.DateField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=100)
+    cursor = serializers.CharField(required=False)
+
+
+class ChangeFeedParamsSerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=500)
+
+
 class PeriodSerializer(serializers.Serializer):
     period = serializers.ChoiceField(choices=['daily', 'monthly', 'quarterly', 'yearly'], required=True)
 
@@ -421,3 +567,28 @@ class ScenarioAnalysisSerializer(serializers.Serializer):
     start_date = serializers.DateField(required=False)
     end_date = serializers.DateField(required=False)
 
+
+class ScenarioGridSerializer(serializers.Serializer):
+    MAX_GRID_SIZE = 10000
+
+    income_adjustments = serializers.ListField(child=serializers.FloatField(min_value=-1), default=[0],
+                                               allow_empty=False)
+    expense_adjustments = serializers.ListField(child=serializers.FloatField(min_value=-1), default=[0],
+                                                allow_empty=False)
+    inflation_rates = serializers.ListField(child=serializers.FloatField(min_value=-0.99), required=False)
+    interest_rates = serializers.ListField(child=serializers.FloatField(min_value=-0.99), required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+
+        grid_size = len(data['income_adjustments']) * len(data['expense_adjustments'])
+        grid_size *= len(data.get('inflation_rates') or [None]) * len(data.get('interest_rates') or [None])
+        if grid_size > self.MAX_GRID_SIZE:
+            raise serializers.ValidationError(f"A scenario grid can have at most {self.MAX_GRID_SIZE} scenarios.")
+        return data
+
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from operations.versioning import bump_data_version_on_commit
+from users.models import Business
+from .helpers import CHANGE_TRACKED_MODELS, record_changes
+from .models import ChangeLogEntry
+
+
+def finance_data_changed(sender, instance, **kwargs):
+    # Saves and deletes only; bulk writes in finance.helpers bump the version themselves.
+    business_id = getattr(instance, 'business_id', None)
+    if business_id is not None:
+        bump_data_version_on_commit(business_id)
+
+
+def tracked_model_saved(sender, instance, created, **kwargs):
+    record_changes(sender, [instance], 'created' if created else 'updated')
+
+
+def tracked_model_deleted(sender, instance, origin=None, **kwargs):
+    # Rows removed along with their business take its change log with them.
+    if isinstance(origin, Business) or getattr(origin, 'model', None) is Business:
+        return
+    record_changes(sender, [instance], 'deleted')
+
+
+for model in apps.get_app_config('finance').get_models():
+    if model is ChangeLogEntry:
+        continue
+    post_save.connect(finance_data_changed, sender=model, dispatch_uid=f'finance_data_changed_save_{model.__name__}')
+    post_delete.connect(finance_data_changed, sender=model,
+                        dispatch_uid=f'finance_data_changed_delete_{model.__name__}')
+
+for model in CHANGE_TRACKED_MODELS:
+    post_save.connect(tracked_model_saved, sender=model, dispatch_uid=f'tracked_model_saved_{model.__name__}')
+    post_delete.connect(tracked_model_deleted, sender=model, dispatch_uid=f'tracked_model_deleted_{model.__name__}')
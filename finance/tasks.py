@@ -0,0 +1,25 @@
+from datetime import date
+
+from operations.registry import register_task
+from users.models import Business
+from .helpers import perform_projection, perform_cash_outflow_projection, generate_report_based_on_date_range
+
+
+@register_task('finance.projection')
+def projection(business_id, period, forecast_steps, seasonal_period, layout='records'):
+    business = Business.objects.get(id=business_id)
+    return perform_projection(business, period, forecast_steps, seasonal_period, layout)
+
+
+@register_task('finance.cash_outflow_projection')
+def cash_outflow_projection(business_id, period, forecast_steps, seasonal_period, layout='records'):
+    business = Business.objects.get(id=business_id)
+    return perform_cash_outflow_projection(business, period, forecast_steps, seasonal_period, layout)
+
+
+@register_task('finance.date_range_report')
+def date_range_report(business_id, start_date=None, end_date=None, layout='records', max_points=None):
+    business = Business.objects.get(id=business_id)
+    start_date = date.fromisoformat(start_date) if start_date else None
+    end_date = date.fromisoformat(end_date) if end_date else None
+    return generate_report_based_on_date_range(business, start_date, end_date, layout, max_points)
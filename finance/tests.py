@@ -1,3 +1,339 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from finance.helpers import calculate_book_values, calculate_remaining_residual_value, compute_amortization_schedule, \
+    downsample_frame, evaluate_refinance_grid, format_predictions, generate_depreciation_schedules, \
+    generate_payment_schedule, get_debt_portfolio, get_next_compact_installments, get_single_asset_register, \
+    get_upcoming_payments, lttb_indices, record_liability_payments
+from finance.models import AccountsPayable, Asset, Expense, Income, Liability, PaymentInstallment, PaymentSchedule, \
+    Supplier
+from users.models import Business, User
+
+
+def create_business_user(name='Acme'):
+    business = Business.objects.create(business_name=name, business_address='1 Main St', business_type='Retail',
+                                       business_email=f'{name.lower()}@example.com')
+    user = User.objects.create_user(username=name.lower(), email=f'owner@{name.lower()}.com', password='secret',
+                                    business=business)
+    user.groups.add(Group.objects.get_or_create(name='Owner')[0])
+    return business, user
+
+
+class DepreciationTests(SimpleTestCase):
+    def asset(self, **fields):
+        values = {'id': 1, 'name': 'Press', 'asset_types': 'Machinery', 'amount': Decimal('10000'),
+                  'residual_value': Decimal('1000'), 'useful_life': 9, 'date_acquired': date.today().year - 3,
+                  'valuation_method': 'Straight-Line', 'is_appreciating': False, 'appreciation_rate': Decimal('5'),
+                  'depreciation_rate': Decimal('0'), 'annual_maintenance_cost': Decimal('0'),
+                  'current_value': Decimal('0')}
+        values.update(fields)
+        return Asset(**values)
+
+    def test_schedules_run_from_cost_down_to_residual_value(self):
+        for method in ('Straight-Line', 'Declining-Balance', 'Double-Declining-Balance', 'Sum-of-the-Years-Digits'):
+            with self.subTest(method=method):
+                asset = self.asset(valuation_method=method)
+                [schedule] = generate_depreciation_schedules(get_single_asset_register(asset))
+                values = schedule['book_values']
+                self.assertEqual((len(values), values[0], values[-1]), (10, 10000, 1000))
+                self.assertTrue(all(a >= b for a, b in zip(values, values[1:])))
+
+    def test_book_values_broadcast_over_elapsed_years(self):
+        register = get_single_asset_register(self.asset())
+        self.assertEqual(calculate_book_values(register, np.array([0, 4.5, 20])).round(2).tolist(),
+                         [[10000, 5500, 1000]])
+
+    def test_appreciating_assets_keep_their_current_value(self):
+        asset = self.asset(is_appreciating=True, valuation_method='Appreciation', current_value=Decimal('12500.50'))
+        self.assertEqual(calculate_remaining_residual_value(asset), 12500.5)
+
+
+class DownsamplingTests(SimpleTestCase):
+    def test_lttb_keeps_the_ends_and_the_spikes(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        y[[137, 612]] = [40, -40]
+        indices = lttb_indices(x, y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue((np.diff(indices) > 0).all())
+        self.assertTrue({137, 612} <= set(indices.tolist()))
+
+    def test_short_series_are_left_alone(self):
+        self.assertEqual(lttb_indices(np.arange(5), np.arange(5), 10).tolist(), [0, 1, 2, 3, 4])
+        df = pd.DataFrame({'date': pd.date_range('2024-01-01', periods=5), 'value': range(5)})
+        self.assertIs(downsample_frame(df, 'value', None), df)
+        self.assertEqual(len(downsample_frame(df, 'value', 3)), 3)
+
+
+class AmortizationScheduleTests(SimpleTestCase):
+    LOANS = [
+        (250000, 34.8, 25, 'Weekly'),
+        (250000, 25, 30, 'Weekly'),
+        (180000, 6.5, 30, 'Monthly'),
+        (5000, 12, 2, 'Bi-Weekly'),
+        (100000, 0, 3, 'Monthly'),
+        (1, 5, 30, 'Monthly'),
+    ]
+
+    def test_installments_reconcile_and_clear_the_principal(self):
+        for principal, rate, term, frequency in self.LOANS:
+            with self.subTest(principal=principal, rate=rate, term=term, frequency=frequency):
+                schedule = compute_amortization_schedule(principal, rate, term, frequency, date(2024, 1, 31))
+                self.assertEqual(int(schedule['principal'].sum()), principal * 100)
+                self.assertTrue((schedule['payment'] == schedule['principal'] + schedule['interest']).all())
+                self.assertTrue((schedule['payment'] > 0).all())
+                self.assertEqual(int(schedule['remaining_principal'][-1]), 0)
+                self.assertEqual(len(schedule['number']), schedule['num_payments'])
+
+    def test_level_payment_keeps_the_full_term_on_high_rate_loans(self):
+        schedule = compute_amortization_schedule(250000, 34.8, 25, 'Weekly', date(2024, 1, 1))
+        self.assertEqual(schedule['num_payments'], 1300)
+        self.assertEqual(len(set(schedule['payment'][:-1].tolist())), 1)
+
+    def test_windows_match_the_full_schedule(self):
+        full = compute_amortization_schedule(250000, 25, 30, 'Weekly', date(2024, 1, 1))
+        window = compute_amortization_schedule(250000, 25, 30, 'Weekly', date(2024, 1, 1), 700, 720)
+        for key in ('number', 'date', 'principal', 'interest', 'payment', 'remaining_principal'):
+            self.assertTrue((window[key] == full[key][700:720]).all(), key)
+
+    def test_monthly_dates_clamp_to_the_end_of_the_month(self):
+        schedule = generate_payment_schedule(1200, 0, 1, 'Monthly', date(2024, 1, 31))
+        self.assertEqual([row['date'] for row in schedule[:3]], [date(2024, 1, 31), date(2024, 2, 29),
+                                                                 date(2024, 3, 31)])
+
+
+class RefinanceGridTests(SimpleTestCase):
+    def test_grid_totals_match_generated_schedules(self):
+        rates = [Decimal('0'), Decimal('4.5'), Decimal('12'), Decimal('25'), Decimal('34.8')]
+        terms = [1, 5, 25, 30]
+        frequencies = ['Weekly', 'Monthly', 'Quarterly']
+        options = evaluate_refinance_grid(Decimal('250000'), rates, terms, frequencies, date(2024, 1, 31))
+
+        self.assertEqual(len(options), len(rates) * len(terms) * len(frequencies))
+        for option in options:
+            with self.subTest(option=option):
+                schedule = compute_amortization_schedule(Decimal('250000'), option['interest_rate'],
+                                                         option['term_years'], option['payment_frequency'],
+                                                         date(2024, 1, 31))
+                self.assertEqual(option['num_payments'], schedule['num_payments'])
+                self.assertEqual(option['periodic_payment'] * 100, int(schedule['payment'][0]))
+                self.assertEqual(option['total_paid'] * 100, int(schedule['payment'].sum()))
+                self.assertEqual(option['total_interest'] * 100, int(schedule['interest'].sum()))
+                self.assertEqual(option['payoff_date'], schedule['date'][-1].astype(date))
+
+
+class RecordLiabilityPaymentsTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/finance/project_schedule/generate-payment-schedule/', {
+            'principal': '1200.00', 'interest_rate': '0', 'term_years': 1, 'payment_frequency': 'Monthly',
+            'start_date': '2024-01-01', 'liability_name': 'Van loan', 'compact': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.schedule = PaymentSchedule.objects.get()
+        self.liability = self.schedule.liability
+
+    def pay(self, amount, number=None):
+        payment = {'liability': self.liability.id, 'amount': Decimal(amount), 'paid_on': date(2024, 1, 5)}
+        if number:
+            payment.update(schedule=self.schedule.id, installment_number=number)
+        return record_liability_payments(self.business, [payment])
+
+    def test_payments_accumulate_without_changing_the_level_payment(self):
+        self.pay('100.00', number=1)
+        self.pay('100.00', number=2)
+        self.schedule.refresh_from_db()
+        self.liability.refresh_from_db()
+        self.assertEqual(self.schedule.installment_amount, Decimal('100.00'))
+        self.assertEqual(self.schedule.paid_amount, Decimal('200.00'))
+        self.assertEqual(self.liability.paid_amount, Decimal('200.00'))
+        self.assertEqual(PaymentInstallment.objects.filter(status='Paid').count(), 2)
+
+    def test_paying_an_installment_twice_is_rejected(self):
+        self.pay('100.00', number=1)
+        with self.assertRaisesMessage(ValueError, 'already paid'):
+            self.pay('100.00', number=1)
+        self.liability.refresh_from_db()
+        self.assertEqual(self.liability.paid_amount, Decimal('100.00'))
+
+    def test_payments_over_the_outstanding_balance_are_rejected(self):
+        self.pay('1000.00')
+        with self.assertRaisesMessage(ValueError, 'outstanding balance'):
+            self.pay('200.01')
+        self.liability.refresh_from_db()
+        self.assertEqual(self.liability.paid_amount, Decimal('1000.00'))
+        self.assertEqual(Liability.objects.get().get_outstanding_balance(), Decimal('200.00'))
+
+    def test_next_installment_skips_any_run_of_prepaid_installments(self):
+        self.assertEqual(get_next_compact_installments([self.schedule], date(2024, 3, 15))[self.liability.id].number,
+                         4)
+        for number in range(1, 11):
+            self.pay('100.00', number=number)
+
+        installment = get_next_compact_installments([self.schedule], date(2024, 1, 1))[self.liability.id]
+        self.assertEqual((installment.number, installment.date), (11, date(2024, 11, 1)))
+        self.assertEqual(get_debt_portfolio(self.business, date(2024, 1, 1))['liabilities'][0]['next_installment'],
+                         {'date': date(2024, 11, 1), 'amount': Decimal('100.00')})
+        upcoming = get_upcoming_payments(self.business, date(2024, 1, 1), date(2024, 12, 31), limit=1)
+        self.assertEqual(upcoming['days'][0]['items'][0]['number'], 11)
+
+
+class UpcomingPaymentsTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name, compact in (('Van loan', False), ('Truck loan', True)):
+            response = self.client.post('/finance/project_schedule/generate-payment-schedule/', {
+                'principal': '1200.00', 'interest_rate': '0', 'term_years': 1, 'payment_frequency': 'Monthly',
+                'start_date': '2024-01-01', 'liability_name': name, 'compact': compact,
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+        supplier = Supplier.objects.create(name='Paper Co', contact_info='-', business=self.business)
+        for due_date, status in ((date(2024, 2, 1), 'Pending'), (date(2024, 2, 15), 'Pending'),
+                                 (date(2024, 3, 1), 'Paid')):
+            AccountsPayable.objects.create(supplier=supplier, amount_due=Decimal('50.00'), due_date=due_date,
+                                           status=status, business=self.business)
+
+    def keys(self, page):
+        return [(item['type'], item['schedule'] if item['type'] == 'installment' else item['id'], item.get('number'))
+                for day in page['days'] for item in day['items']]
+
+    def test_pages_follow_the_cursor_without_gaps_or_repeats(self):
+        start, end = date(2024, 1, 1), date(2024, 6, 30)
+        everything = self.keys(get_upcoming_payments(self.business, start, end, limit=500))
+        self.assertEqual(len(everything), 14)
+
+        walked, cursor = [], None
+        while True:
+            page = get_upcoming_payments(self.business, start, end, limit=3, cursor=cursor)
+            self.assertLessEqual(len(self.keys(page)), 3)
+            walked += self.keys(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(walked, everything)
+
+    def test_paid_installments_leave_the_calendar(self):
+        schedule = PaymentSchedule.objects.get(is_compact=False)
+        PaymentInstallment.objects.filter(schedule=schedule, number=1).update(status='Paid')
+        page = get_upcoming_payments(self.business, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(self.keys(page), [('installment', PaymentSchedule.objects.get(is_compact=True).id, 1)])
+        self.assertEqual(page['days'][0]['total'], Decimal('100.00'))
+
+
+class BulkImportTests(TestCase):
+    url = '/finance/incomes/bulk_import/'
+
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def row(self, **overrides):
+        return {'date': '2024-03-01T10:00:00Z', 'amount': '1250.10', 'source': 'Sales', 'description': 'Invoice 1',
+                'currency': 'USD', **overrides}
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100, IMPORT_MAX_BODY_SIZE=10000)
+    def test_json_bodies_use_the_import_limit(self):
+        response = self.client.post(self.url, [self.row()], format='json')
+        self.assertEqual(response.json()['imported'], 1)
+        self.assertEqual(Income.objects.get().amount, Decimal('1250.10'))
+
+        rows = [self.row(description=f'Invoice {i}') for i in range(100)]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_and_duplicate_rows_are_reported(self):
+        rows = [self.row(), self.row(), self.row(description='Bad', amount='abc'),
+                self.row(description='Negative', amount=-5), self.row(description='Huge', amount='1e30'),
+                self.row(description='Number', amount=19.99)]
+        result = self.client.post(self.url, {'rows': rows}, format='json').json()
+        self.assertEqual((result['received'], result['imported'], result['failed']), (6, 2, 4))
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3, 4, 5])
+        self.assertEqual(Income.objects.get(description='Number').amount, Decimal('19.99'))
+
+        result = self.client.post(self.url, [self.row()], format='json').json()
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['errors'], [{'row': 1, 'errors': ['Income already exists.']}])
+
+
+class ColumnarLayoutTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reports_return_columns_with_money_as_strings(self):
+        Income.objects.create(user=self.user, business=self.business, date='2024-03-01T10:00:00Z',
+                              amount=Decimal('1250.10'), source='Sales', description='Invoice 1', currency='USD')
+        Expense.objects.create(user=self.user, business=self.business, date='2024-03-02T10:00:00Z',
+                               amount=Decimal('0.30'), expense_category='Rent', description='Rent', currency='USD')
+
+        report = self.client.get('/finance/cash_flow/all_records/', {'layout': 'columnar'}).json()
+        self.assertEqual(report, {'length': 2, 'columns': {
+            'date': ['2024-03-01', '2024-03-02'],
+            'inflow': ['1250.10', '0.00'],
+            'outflow': ['0.00', '0.30'],
+            'net_cash_flow': ['1250.10', '-0.30'],
+        }})
+
+    def test_projections_use_the_same_shape(self):
+        predictions = format_predictions(['2024-04', '2024-05'], [10.006, 0.1 + 0.2], 'predicted_outflow', 'columnar')
+        self.assertEqual(predictions, {'length': 2, 'columns': {'date': ['2024-04', '2024-05'],
+                                                                'predicted_outflow': ['10.01', '0.30']}})
+
+
+class ChangeFeedTests(TestCase):
+    url = '/finance/changes/'
+
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.other_business, other_user = create_business_user('Globex')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Income.objects.create(user=other_user, business=self.other_business, amount=Decimal('5.00'), source='Sales',
+                              description='Elsewhere', currency='USD')
+
+    def test_changes_are_listed_in_order_and_paged_by_sequence(self):
+        income = Income.objects.create(user=self.user, business=self.business, amount=Decimal('10.00'),
+                                       source='Sales', description='Invoice 1', currency='USD')
+        income.amount = Decimal('12.00')
+        income.save()
+        income_id = income.id
+        income.delete()
+
+        first = self.client.get(self.url, {'limit': 2}).json()
+        self.assertEqual([(change['model'], change['object_id'], change['action']) for change in first['changes']],
+                         [('income', income_id, 'created'), ('income', income_id, 'updated')])
+        self.assertEqual(first['changes'][1]['data']['amount'], '12.00')
+        self.assertTrue(first['has_more'])
+
+        rest = self.client.get(self.url, {'since': first['next_cursor']}).json()
+        self.assertEqual([(change['action'], change['data']) for change in rest['changes']], [('deleted', None)])
+        self.assertFalse(rest['has_more'])
+
+        empty = self.client.get(self.url, {'since': rest['next_cursor']}).json()
+        self.assertEqual((empty['changes'], empty['next_cursor']), ([], rest['next_cursor']))
+
+    def test_bulk_payments_are_recorded(self):
+        liability = Liability.objects.create(user=self.user, business=self.business, name='Loan', amount=500,
+                                             description='Loan', date_incurred=date(2024, 1, 1),
+                                             liability_type='Current', due_date=date(2025, 1, 1))
+        since = self.client.get(self.url).json()['next_cursor']
+        record_liability_payments(self.business, [{'liability': liability.id, 'amount': Decimal('120.00'),
+                                                   'paid_on': date(2024, 2, 1)}])
+
+        [change] = self.client.get(self.url, {'since': since}).json()['changes']
+        self.assertEqual((change['model'], change['object_id'], change['action']), ('liability', liability.id,
+                                                                                      'updated'))
+        self.assertEqual(Decimal(change['data']['paid_amount']), Decimal('120.00'))
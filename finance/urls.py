@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import IncomeViewSet, ExpenseViewSet, AssetViewSet, AssetProjectSimulation, LiabilityViewSet, \
-    PaymentScheduleViewSet, CollateralViewSet, CashFlowProjectionViewSet, CashFlowOptimizationViewSet
+    PaymentScheduleViewSet, CollateralViewSet, CashFlowProjectionViewSet, CashFlowOptimizationViewSet, \
+    MacroAssumptionViewSet, ChangeFeedViewSet
 
 router = DefaultRouter()
 router.register(r'incomes', IncomeViewSet, basename='income')
@@ -13,6 +14,8 @@ router.register(r'project_schedule', PaymentScheduleViewSet, basename='project_s
 router.register(r'collateral', CollateralViewSet, basename='collateral')
 router.register(r'cash_projections', CashFlowProjectionViewSet, basename='cash_projections')
 router.register(r'cash_flow', CashFlowOptimizationViewSet, basename='cash_flow')
+router.register(r'macro_assumptions', MacroAssumptionViewSet, basename='macro_assumptions')
+router.register(r'changes', ChangeFeedViewSet, basename='changes')
 urlpatterns = [
     path('', include(router.urls)),
 ]
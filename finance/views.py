@@ -1,26 +1,48 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from django.db.models import Sum
-from django.http import Http404, JsonResponse
+from django.db import connection, transaction
+from django.db.models import Sum, Max
+from django.http import Http404
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework_simplejwt.models import TokenUser
-from users.models import User
-from .helpers import generate_asset_project_simulations, get_comprehensive_breakdown, explain_scenario_keys, \
+
+from AMS.renderers import JsonResponse
+from users.models import Business, User
+from .helpers import get_asset_scenarios, get_comprehensive_breakdown, explain_scenario_keys, \
     generate_asset_report, calculate_total_assets, calculate_interest_accrual, \
     track_loan_payments, perform_projection, calculate_remaining_balance, \
     calculate_remaining_balance_for_period, generate_report_based_on_period, generate_report_based_on_date_range, \
-    calculate_real_time_data, perform_cash_outflow_projection, create_financial_dataframe
+    calculate_real_time_data, perform_cash_outflow_projection, create_financial_dataframe, \
+    generate_portfolio_simulations, get_asset_register, generate_depreciation_schedules, calculate_total_book_value, \
+    recalculate_asset_rates, materialize_installments, persist_installment, serialize_installment, \
+    evaluate_refinance_grid, get_debt_portfolio, get_upcoming_payments, record_liability_payments, \
+    import_transactions, read_import_rows, get_changes, evaluate_scenario_grid
 
 from .models import Income, Expense, Asset, Liability, PaymentSchedule, Creditor, Collateral, Customer, Supplier, \
-    AccountsReceivable, AccountsPayable
+    AccountsReceivable, AccountsPayable, MacroAssumption
 from .serializers import IncomeSerializer, ExpenseSerializer, AssetListSerializer, AssetDetailSerializer, \
     ScenarioSerializer, RiskToleranceSerializer, StorySerializer, ExplainScenarioSerializer, \
     ScenarioQueryParamsSerializer, LiabilitySerializer, PaymentScheduleSerializer, CreditorSerializer, \
     CollateralSerializer, GeneratePaymentScheduleSerializer, CustomerSerializer, SupplierSerializer, \
     ProjectionInputSerializer, PendingPaymentSummaryForPeriodSerializer, PendingPaymentSummarySerializer, \
-    DateRangeSerializer, PeriodSerializer, RealTimeMonitoringSerializer, ScenarioAnalysisSerializer
+    DateRangeSerializer, ReportLayoutParamsSerializer, SeriesParamsSerializer, PeriodSerializer, \
+    RealTimeMonitoringSerializer, ScenarioAnalysisSerializer, ScenarioGridSerializer, \
+    PortfolioSimulationParamsSerializer, PortfolioSimulationSerializer, DepreciationScheduleParamsSerializer, \
+    TotalAssetsParamsSerializer, MacroAssumptionSerializer, InstallmentWindowParamsSerializer, \
+    InstallmentUpdateSerializer, RefinanceOptionsSerializer, UpcomingPaymentsParamsSerializer, \
+    RecordPaymentsSerializer, ChangeFeedParamsSerializer
 from .permissions import IsOwnerAdminManagerOrReadonly, IsOwnerOrAdmin
+from operations.admission import AdmissionControlMixin
+from operations.coalescing import coalesce
+from operations.registry import enqueue
+from operations.response_cache import cached_response
+from operations.views import job_accepted
+
+
+def wants_async(request):
+    """Whether the client asked for the work to run as a background job (``?async=true``)."""
+    return str(request.query_params.get('async', '')).lower() in ('1', 'true', 'yes')
 
 
 class BusinessOwnerViewSet(viewsets.ModelViewSet):
@@ -84,6 +106,24 @@ class IncomeViewSet(BusinessOwnerViewSet):
 
         raise Http404("No Income matches the given query.")
 
+    @action(detail=False, methods=['post'], url_path='bulk_import')
+    def bulk_import(self, request):
+        user = request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        business = getattr(user, 'business', None)
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        try:
+            rows = read_import_rows(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_transactions(business, user, Income, rows)
+        return JsonResponse(result, status=status.HTTP_200_OK)
+
 
 class ExpenseViewSet(BusinessOwnerViewSet):
     queryset = Expense.objects.all()
@@ -103,6 +143,24 @@ class ExpenseViewSet(BusinessOwnerViewSet):
 
         raise Http404("No expense matches the given query.")
 
+    @action(detail=False, methods=['post'], url_path='bulk_import')
+    def bulk_import(self, request):
+        user = request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        business = getattr(user, 'business', None)
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        try:
+            rows = read_import_rows(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_transactions(business, user, Expense, rows)
+        return JsonResponse(result, status=status.HTTP_200_OK)
+
 
 class AssetViewSet(BusinessOwnerViewSet):
     queryset = Asset.objects.all()
@@ -139,20 +197,76 @@ class AssetViewSet(BusinessOwnerViewSet):
         return JsonResponse({'appreciation_value': appreciation_value})
 
     @action(detail=False, methods=['get'], url_path='total-assets')
+    @cached_response('total_assets')
     def total_assets(self, request):
         business = self.get_business()
 
         if business is None:
             return JsonResponse({"error": "User has no associated business."}, status=400)
 
+        params_serializer = TotalAssetsParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+
         assets = Asset.objects.filter(business=business)
+
+        if params_serializer.validated_data['basis'] == 'book_value':
+            as_of = params_serializer.validated_data.get('as_of') or date.today()
+            book_value = calculate_total_book_value(assets, as_of)
+            return JsonResponse({
+                "total_assets": book_value['total'],
+                "by_asset_type": book_value['by_asset_type'],
+                "basis": "book_value",
+                "as_of": as_of,
+            })
+
         total = calculate_total_assets(assets)
 
         return JsonResponse({"total_assets": total})
 
+    @action(detail=False, methods=['get'], url_path='depreciation-schedule')
+    @cached_response('depreciation_schedule')
+    def depreciation_schedule(self, request):
+        business = self.get_business()
+
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        params_serializer = DepreciationScheduleParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+        frequency = params_serializer.validated_data['frequency']
 
-class AssetProjectSimulation(viewsets.ViewSet):
+        register = get_asset_register(Asset.objects.filter(business=business))
+        schedules = generate_depreciation_schedules(register, frequency,
+                                                    params_serializer.validated_data.get('periods'))
+
+        return JsonResponse({"frequency": frequency, "assets": schedules})
+
+
+class MacroAssumptionViewSet(BusinessOwnerViewSet):
+    queryset = MacroAssumption.objects.order_by('-version')
+    serializer_class = MacroAssumptionSerializer
+    permission_classes = [IsOwnerOrAdmin]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def perform_create(self, serializer):
+        business = self.get_business()
+        if business is None:
+            raise serializers.ValidationError("User has no associated business.")
+
+        # Every change is stored as a new version; derived asset rates follow it in bulk.
+        with transaction.atomic():
+            # Locking the business row serializes concurrent creates, so each one reads the latest version.
+            Business.objects.select_for_update(no_key=connection.features.has_select_for_no_key_update).get(
+                id=business.id)
+            latest_version = MacroAssumption.objects.filter(business=business).aggregate(
+                latest=Max('version'))['latest'] or 0
+            assumption = serializer.save(business=business, version=latest_version + 1)
+            recalculate_asset_rates(business, assumption)
+
+
+class AssetProjectSimulation(AdmissionControlMixin, viewsets.ViewSet):
     permission_classes = [IsOwnerOrAdmin]
+    admission_pool = 'simulation'
 
     def get_asset(self, pk):
         try:
@@ -161,40 +275,70 @@ class AssetProjectSimulation(viewsets.ViewSet):
             raise Http404("No asset matches the given query.")
         return asset
 
+    def get_business(self):
+        user = self.request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        return getattr(user, 'business', None)
+
+    @action(detail=False, methods=['get'])
+    @cached_response('portfolio_analysis')
+    def portfolio_analysis(self, request):
+        business = self.get_business()
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        params_serializer = PortfolioSimulationParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+        try:
+            portfolio = generate_portfolio_simulations(business, **params_serializer.validated_data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        serializer = PortfolioSimulationSerializer(portfolio)
+        return JsonResponse(serializer.data)
+
     @action(detail=True, methods=['get'])
+    @cached_response('asset_analysis')
     def asset_analysis(self, request, pk=None):
         asset = self.get_asset(pk)
         risk_tolerance_serializer = RiskToleranceSerializer(data=request.query_params)
         risk_tolerance_serializer.is_valid(raise_exception=True)
-        risk_tolerance = risk_tolerance_serializer.validated_data['risk_tolerance']
-        scenarios = generate_asset_project_simulations(asset, risk_tolerance=risk_tolerance)
+        scenarios = get_asset_scenarios(asset, **risk_tolerance_serializer.validated_data)
         serializer = ScenarioSerializer(scenarios, many=True)
         return JsonResponse(serializer.data, safe=False)
 
     @action(detail=True, methods=['get'])
+    @cached_response('comprehensive_breakdown')
     def comprehensive_breakdown(self, request, pk=None):
         asset = self.get_asset(pk)
         breakdown = get_comprehensive_breakdown(asset)
         return JsonResponse(breakdown)
 
     @action(detail=True, methods=['get'])
+    @cached_response('explain_scenario')
     def explain_scenario(self, request, pk=None):
         asset = self.get_asset(pk)
-        year = int(request.query_params.get('year', 1))
-        scenarios = generate_asset_project_simulations(asset)
+        params_serializer = ScenarioQueryParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+        params = dict(params_serializer.validated_data)
+        year = params.pop('year')
+        scenarios = get_asset_scenarios(asset, **params)
         explanation = explain_scenario_keys(asset, year, scenarios)
         serializer = ExplainScenarioSerializer({'year': year, 'explanation': explanation})
         return JsonResponse(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @cached_response('generate_asset_report')
     def generate_asset_report(self, request, pk=None):
         asset = self.get_asset(pk)
         params_serializer = ScenarioQueryParamsSerializer(data=request.query_params)
         params_serializer.is_valid(raise_exception=True)
-        year = params_serializer.validated_data['year']
-        risk_tolerance = params_serializer.validated_data['risk_tolerance']
-        scenarios = generate_asset_project_simulations(asset, risk_tolerance=risk_tolerance)
-        story = generate_asset_report(asset, year, scenarios, risk_tolerance)
+        params = dict(params_serializer.validated_data)
+        year = params.pop('year')
+        scenarios = get_asset_scenarios(asset, **params)
+        story = generate_asset_report(asset, year, scenarios, params['risk_tolerance'])
         serializer = StorySerializer({'year': year, 'story': story})
         return JsonResponse(serializer.data)
 
@@ -218,6 +362,7 @@ class LiabilityViewSet(BusinessOwnerViewSet):
         raise Http404("No liability matches the given query.")
 
     @action(detail=False, methods=['get'], url_path='total-liabilities')
+    @cached_response('total_liabilities')
     def total_liabilities(self, request):
         user = request.user
         if isinstance(user, TokenUser):
@@ -234,6 +379,37 @@ class LiabilityViewSet(BusinessOwnerViewSet):
 
         return JsonResponse({"total_liabilities": total_amount})
 
+    @action(detail=False, methods=['get'], url_path='debt_portfolio')
+    @cached_response('debt_portfolio')
+    def debt_portfolio(self, request):
+        business = self.get_business()
+        if business is None:
+            return JsonResponse({"error": "User is not associated with any business."}, status=400)
+
+        return JsonResponse(get_debt_portfolio(business))
+
+    @action(detail=False, methods=['post'], url_path='record_payments')
+    def record_payments(self, request):
+        business = self.get_business()
+        if business is None:
+            return JsonResponse({"error": "User is not associated with any business."}, status=400)
+
+        serializer = RecordPaymentsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        payments = serializer.validated_data['payments']
+        try:
+            liabilities = record_liability_payments(business, payments)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({
+            "message": "Payments recorded successfully.",
+            "recorded": len(payments),
+            "liabilities": liabilities
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get'], url_path='debt_management')
     def debt_management(self, request, pk=None):
         liability = self.get_object()
@@ -252,6 +428,28 @@ class LiabilityViewSet(BusinessOwnerViewSet):
             "payment_history": payment_history_serializer.data
         })
 
+    @action(detail=True, methods=['post'], url_path='refinance_options')
+    def refinance_options(self, request, pk=None):
+        serializer = RefinanceOptionsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        liability = self.get_object()
+        outstanding_balance = liability.get_outstanding_balance()
+        if outstanding_balance <= 0:
+            return JsonResponse({"error": "Liability has no outstanding balance to refinance."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        options = evaluate_refinance_grid(outstanding_balance, data['interest_rates'], data['term_years'],
+                                          data['payment_frequencies'], data.get('start_date', date.today()))
+
+        return JsonResponse({
+            "liability": liability.id,
+            "outstanding_balance": outstanding_balance,
+            "options": options
+        })
+
 
 class PaymentScheduleViewSet(BusinessOwnerViewSet):
     queryset = PaymentSchedule.objects.all()
@@ -266,7 +464,7 @@ class PaymentScheduleViewSet(BusinessOwnerViewSet):
             try:
                 payment_schedule = PaymentSchedule.objects.get(business=business, id=payment_schedule_id)
                 return payment_schedule
-            except Expense.DoesNotExist:
+            except PaymentSchedule.DoesNotExist:
                 raise Http404("No payment schedule matches the given query.")
 
         raise Http404("No payment schedule matches the given query.")
@@ -282,6 +480,46 @@ class PaymentScheduleViewSet(BusinessOwnerViewSet):
             }, status=status.HTTP_201_CREATED)
         return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def installments(self, request, pk=None):
+        params = InstallmentWindowParamsSerializer(data=request.query_params)
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        payment_schedule = self.get_object()
+        window_start = params.validated_data.get('start_date', date.today())
+        window_end = params.validated_data.get('end_date', window_start + timedelta(days=365))
+
+        installments = materialize_installments(payment_schedule, window_start, window_end)
+        return JsonResponse({
+            "schedule": payment_schedule.id,
+            "start_date": window_start,
+            "end_date": window_end,
+            "installments": installments
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='update-installment')
+    def update_installment(self, request, pk=None):
+        serializer = InstallmentUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        payment_schedule = self.get_object()
+        changes = dict(serializer.validated_data)
+        number = changes.pop('number')
+        if 'status' not in changes:
+            changes['status'] = 'Paid' if changes.get('paid_on') else 'Adjusted'
+
+        try:
+            installment = persist_installment(payment_schedule, number, **changes)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({
+            "message": "Installment saved successfully.",
+            "installment": serialize_installment(installment)
+        }, status=status.HTTP_200_OK)
+
 
 class CreditorViewSet(BusinessOwnerViewSet):
     queryset = Creditor.objects.all()
@@ -361,6 +599,7 @@ class SupplierViewSet(BusinessOwnerViewSet):
 
 class CashFlowOptimizationViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
+    @cached_response('pending_payments_summary')
     def pending_payments_summary(self, request):
         user = self.request.user
         if isinstance(user, TokenUser):
@@ -374,16 +613,38 @@ class CashFlowOptimizationViewSet(viewsets.ViewSet):
         if date_serializer.is_valid():
             start_date = date_serializer.validated_data['start_date']
             end_date = date_serializer.validated_data['end_date']
-            print(f'start_date: {start_date}, end_date: {end_date}')
             total_pending_payments = calculate_remaining_balance_for_period(business, start_date, end_date)
             serializer = PendingPaymentSummaryForPeriodSerializer(total_pending_payments)
         else:
-            print('Date range validation failed:', date_serializer.errors)
             total_pending_payments = calculate_remaining_balance(business)
             serializer = PendingPaymentSummarySerializer(total_pending_payments)
 
         return JsonResponse(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def upcoming_payments(self, request):
+        user = self.request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        business = getattr(user, 'business', None)
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        params = UpcomingPaymentsParamsSerializer(data=request.query_params)
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=400)
+
+        start_date = params.validated_data.get('start_date', date.today())
+        end_date = start_date + timedelta(days=params.validated_data['days'])
+        try:
+            upcoming = get_upcoming_payments(business, start_date, end_date, params.validated_data['limit'],
+                                             params.validated_data.get('cursor'))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        return JsonResponse({"start_date": start_date, "end_date": end_date, **upcoming})
+
     @action(detail=False, methods=['get'])
     def strategies(self, request):
         strategies = [
@@ -436,6 +697,7 @@ class CashFlowOptimizationViewSet(viewsets.ViewSet):
             return JsonResponse(serializer.errors, status=400)
 
     @action(detail=False, methods=['get'])
+    @cached_response('date_range_report')
     def date_range_report(self, request):
         user = request.user
         if isinstance(user, TokenUser):
@@ -444,6 +706,12 @@ class CashFlowOptimizationViewSet(viewsets.ViewSet):
         if business is None:
             raise serializers.ValidationError("User has no associated business.")
 
+        series_params = SeriesParamsSerializer(data=request.query_params)
+        if not series_params.is_valid():
+            return JsonResponse(series_params.errors, status=400)
+        layout = series_params.validated_data['layout']
+        max_points = series_params.validated_data.get('max_points')
+
         date_serializer = DateRangeSerializer(data=request.data)
         if date_serializer.is_valid():
             start_date = date_serializer.validated_data.get('start_date')
@@ -453,7 +721,17 @@ class CashFlowOptimizationViewSet(viewsets.ViewSet):
                 end_date = datetime.strptime(str(end_date), '%Y-%m-%d').date()
             except ValueError:
                 return JsonResponse({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
-            report = generate_report_based_on_date_range(business, start_date, end_date)
+
+            if wants_async(request):
+                job = enqueue('finance.date_range_report', business, user, {
+                    'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(), 'layout': layout,
+                    'max_points': max_points})
+                return job_accepted(request, job)
+
+            params = {'start_date': start_date, 'end_date': end_date, 'layout': layout, 'max_points': max_points}
+            report = coalesce('date_range_report', business.id, params,
+                              lambda: generate_report_based_on_date_range(business, start_date, end_date, layout,
+                                                                          max_points))
             return JsonResponse(report, safe=False)
         else:
             return JsonResponse(date_serializer.errors, status=400)
@@ -467,17 +745,51 @@ class CashFlowOptimizationViewSet(viewsets.ViewSet):
         if business is None:
             raise serializers.ValidationError("User has no associated business.")
 
-        report = generate_report_based_on_date_range(business)
+        series_params = SeriesParamsSerializer(data=request.query_params)
+        if not series_params.is_valid():
+            return JsonResponse(series_params.errors, status=400)
+        params = {'layout': series_params.validated_data['layout'],
+                  'max_points': series_params.validated_data.get('max_points')}
+
+        if wants_async(request):
+            return job_accepted(request, enqueue('finance.date_range_report', business, user, params))
+
+        report = coalesce('date_range_report', business.id, params,
+                          lambda: generate_report_based_on_date_range(business, **params))
         return JsonResponse(report, safe=False)
 
 
-class CashFlowProjectionViewSet(viewsets.ViewSet):
+class ChangeFeedViewSet(viewsets.ViewSet):
+    permission_classes = [IsOwnerAdminManagerOrReadonly]
+
+    def list(self, request):
+        user = request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        business = getattr(user, 'business', None)
+        if business is None:
+            return JsonResponse({"error": "User has no associated business."}, status=400)
+
+        params = ChangeFeedParamsSerializer(data=request.query_params)
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=400)
+
+        return JsonResponse(get_changes(business, **params.validated_data))
+
+
+class CashFlowProjectionViewSet(AdmissionControlMixin, viewsets.ViewSet):
+    admission_pool = 'projection'
+
     @action(detail=False, methods=['post'])
     def projection(self, request):
         user = request.user
         serializer = ProjectionInputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         validated_data = serializer.validated_data
+        layout_params = ReportLayoutParamsSerializer(data=request.query_params)
+        layout_params.is_valid(raise_exception=True)
+        layout = layout_params.validated_data['layout']
 
         period = validated_data.get('period')
         forecast_steps = validated_data.get('forecast_steps')
@@ -490,7 +802,13 @@ class CashFlowProjectionViewSet(viewsets.ViewSet):
         if business is None:
             raise serializers.ValidationError("User has no associated business.")
 
-        results = perform_projection(business, period, forecast_steps, seasonal_period)
+        params = {'period': period, 'forecast_steps': forecast_steps, 'seasonal_period': seasonal_period,
+                  'layout': layout}
+        if wants_async(request):
+            return job_accepted(request, enqueue('finance.projection', business, user, params))
+
+        results = coalesce('projection', business.id, params,
+                           lambda: perform_projection(business, period, forecast_steps, seasonal_period, layout))
 
         return JsonResponse(results)
 
@@ -503,17 +821,50 @@ class CashFlowProjectionViewSet(viewsets.ViewSet):
         if business is None:
             raise serializers.ValidationError("User has no associated business.")
 
+        layout_params = ReportLayoutParamsSerializer(data=request.query_params)
+        if not layout_params.is_valid():
+            return JsonResponse(layout_params.errors, status=400)
+        layout = layout_params.validated_data['layout']
+
         serializer = ProjectionInputSerializer(data=request.data)
         if serializer.is_valid():
             period = serializer.validated_data['period']
             forecast_steps = serializer.validated_data['forecast_steps']
             seasonal_period = serializer.validated_data['seasonal_period']
 
-            projection = perform_cash_outflow_projection(business, period, forecast_steps, seasonal_period)
+            params = {'period': period, 'forecast_steps': forecast_steps, 'seasonal_period': seasonal_period,
+                      'layout': layout}
+            if wants_async(request):
+                return job_accepted(request, enqueue('finance.cash_outflow_projection', business, user, params))
+
+            projection = coalesce(
+                'cash_outflow_projection', business.id, params,
+                lambda: perform_cash_outflow_projection(business, period, forecast_steps, seasonal_period, layout))
             return JsonResponse(projection, safe=False)
         else:
             return JsonResponse(serializer.errors, status=400)
 
+    @action(detail=False, methods=['post'])
+    def scenario_grid(self, request):
+        user = request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+        business = getattr(user, 'business', None)
+        if business is None:
+            raise serializers.ValidationError("User has no associated business.")
+
+        serializer = ScenarioGridSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        params = serializer.validated_data
+        try:
+            scenarios = coalesce('scenario_grid', business.id, params,
+                                 lambda: evaluate_scenario_grid(business, **params))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse({"scenarios": scenarios})
+
     @action(detail=False, methods=['get'])
     def get_face_value_analysis(self, request):
         user = request.user
@@ -523,10 +874,14 @@ class CashFlowProjectionViewSet(viewsets.ViewSet):
         if business is None:
             raise serializers.ValidationError("User has no associated business.")
 
+        series_params = SeriesParamsSerializer(data=request.query_params)
+        if not series_params.is_valid():
+            return JsonResponse(series_params.errors, status=400)
+
         serializer = DateRangeSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                dataframe = create_financial_dataframe(business)
+                dataframe = create_financial_dataframe(business, **series_params.validated_data)
                 return JsonResponse(dataframe, safe=False)
             except ValueError as e:
                 return JsonResponse({"error": str(e)}, status=400)
@@ -0,0 +1,176 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+from users.identity import get_user_identity
+
+_pools = {}
+
+
+def take_slot(key, limit):
+    """Take one of ``limit`` slots counted at ``key``, returning whether one was free.
+
+    The count lives in the shared cache with a TTL that every admission
+    renews, so slots leaked by a process that died while holding them
+    expire once the pool has been idle for ADMISSION_SLOT_TTL_SECONDS.
+    """
+    cache.add(key, 0, timeout=settings.ADMISSION_SLOT_TTL_SECONDS)
+    try:
+        taken = cache.incr(key)
+    except ValueError:
+        # The count expired between add() and incr().
+        cache.add(key, 0, timeout=settings.ADMISSION_SLOT_TTL_SECONDS)
+        taken = cache.incr(key)
+    if taken > limit:
+        release_slot(key)
+        return False
+    cache.touch(key, settings.ADMISSION_SLOT_TTL_SECONDS)
+    return True
+
+
+def release_slot(key):
+    try:
+        if cache.decr(key) < 0:
+            # The count expired and restarted while this slot was held.
+            cache.incr(key)
+    except ValueError:
+        pass
+
+
+class AdmissionPool:
+    """Concurrency limit for one group of endpoints, overall and per business.
+
+    Requests over the limit wait in a bounded queue for up to ``max_wait``
+    seconds and are shed with 429 when the queue is full or the wait runs
+    out.
+
+    The slot, queue and metric counters live in the shared cache, so the
+    limits hold across every server process, including sync WSGI workers
+    that serve one request each, and the metrics cover all of them. Counts
+    are updated with the cache's ``incr``/``decr``, which are atomic with
+    Redis (REDIS_URL); the database cache fallback can let a burst overshoot
+    a limit slightly.
+    """
+
+    def __init__(self, name, concurrency, per_business, max_queue, max_wait):
+        self.name = name
+        self.concurrency = concurrency
+        self.per_business = per_business
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+    def key(self, *parts):
+        return ':'.join(['admission', self.name, *map(str, parts)])
+
+    def count(self, counter):
+        key = self.key(counter)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, timeout=None)
+
+    def average_duration(self):
+        return cache.get(self.key('average_duration'), 1.0)
+
+    def retry_after(self):
+        waiting = cache.get(self.key('waiting'), 0)
+        return max(1, math.ceil(self.average_duration() * (waiting + 1) / self.concurrency))
+
+    def reject(self):
+        self.count('rejected')
+        raise Throttled(wait=self.retry_after(), detail="Too many analytics requests are running. Try again later.")
+
+    def admit(self, business_id):
+        waiting_key = self.key('waiting')
+        if not take_slot(waiting_key, self.max_queue):
+            self.reject()
+
+        slots_key, business_key = self.key('in_flight'), self.key('business', business_id, 'in_flight')
+        deadline = time.monotonic() + self.max_wait
+        admitted = False
+        try:
+            while True:
+                if take_slot(business_key, self.per_business):
+                    if take_slot(slots_key, self.concurrency):
+                        admitted = True
+                        break
+                    release_slot(business_key)
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(settings.ADMISSION_POLL_SECONDS)
+        finally:
+            release_slot(waiting_key)
+
+        if not admitted:
+            self.reject()
+        self.count('admitted')
+        return AdmissionTicket(self, slots_key, business_key)
+
+    def metrics(self):
+        counters = cache.get_many([self.key(counter) for counter in ('in_flight', 'waiting', 'admitted', 'rejected')])
+        in_flight, waiting, admitted, rejected = (
+            max(counters.get(self.key(counter), 0), 0) for counter in ('in_flight', 'waiting', 'admitted', 'rejected')
+        )
+        return {
+            'concurrency': self.concurrency,
+            'per_business': self.per_business,
+            'max_queue': self.max_queue,
+            'in_flight': in_flight,
+            'waiting': waiting,
+            'utilization': round(in_flight / self.concurrency, 4),
+            'queue_fill': round(waiting / self.max_queue, 4) if self.max_queue else 0,
+            'admitted': admitted,
+            'rejected': rejected,
+            'average_duration': round(self.average_duration(), 4),
+        }
+
+
+class AdmissionTicket:
+    def __init__(self, pool, slots_key, business_key):
+        self.pool = pool
+        self.slots_key = slots_key
+        self.business_key = business_key
+        self.started = time.monotonic()
+
+    def release(self):
+        duration = time.monotonic() - self.started
+        release_slot(self.slots_key)
+        release_slot(self.business_key)
+        # A moving average shared by every process; concurrent updates may drop a sample.
+        cache.set(self.pool.key('average_duration'), 0.8 * self.pool.average_duration() + 0.2 * duration,
+                  timeout=None)
+
+
+def get_pool(name):
+    if name not in _pools:
+        _pools[name] = AdmissionPool(name, **settings.ADMISSION_POOLS[name])
+    return _pools[name]
+
+
+def admission_metrics():
+    return {name: get_pool(name).metrics() for name in settings.ADMISSION_POOLS}
+
+
+def get_business_id(user):
+    identity = get_user_identity(user)
+    return identity['business_id'] if identity else None
+
+
+class AdmissionControlMixin:
+    """Admit requests to a viewset through the ``admission_pool`` limits."""
+    admission_pool = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.admission_ticket = get_pool(self.admission_pool).admit(get_business_id(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        ticket = getattr(self, 'admission_ticket', None)
+        if ticket is not None:
+            self.admission_ticket = None
+            ticket.release()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from operations.versioning import get_data_version
+
+MISSING = object()
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def coalescing_key(name, business_id, params):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f'singleflight:{name}:{business_id}:{get_data_version(business_id)}:{digest}'
+
+
+def coalesce(name, business_id, params, compute):
+    """Run ``compute()`` once for concurrent identical calls and share its result.
+
+    Calls are identical when they have the same name, business, parameters
+    and business data version. Threads of one process wait on the same
+    future. Other processes see a lock in the default cache, which settings
+    configure as a store shared by every process (Redis or the database
+    cache), and wait for the result the leader stores there. With a
+    per-process cache backend only the in-process coalescing applies. A
+    caller that waits longer than COALESCE_WAIT_SECONDS computes the result
+    itself.
+    """
+    key = coalescing_key(name, business_id, params)
+
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        try:
+            return future.result(timeout=settings.COALESCE_WAIT_SECONDS)
+        except TimeoutError:
+            return compute()
+
+    try:
+        result = compute_shared(key, compute)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+def compute_shared(key, compute):
+    result_key, lock_key = f'{key}:result', f'{key}:lock'
+
+    result = cache.get(result_key, MISSING)
+    if result is not MISSING:
+        return result
+
+    acquired = cache.add(lock_key, True, timeout=settings.COALESCE_WAIT_SECONDS)
+    if not acquired:
+        deadline = time.monotonic() + settings.COALESCE_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(settings.COALESCE_POLL_SECONDS)
+            result = cache.get(result_key, MISSING)
+            if result is not MISSING:
+                return result
+            if cache.get(lock_key) is None:
+                break
+
+    try:
+        result = compute()
+        cache.set(result_key, result, timeout=settings.COALESCE_RESULT_TTL_SECONDS)
+        return result
+    finally:
+        if acquired:
+            cache.delete(lock_key)
@@ -0,0 +1,43 @@
+import json
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from AMS import renderers
+
+
+class Command(BaseCommand):
+    help = "Compare JSON encode time of a report-shaped payload with DjangoJSONEncoder and AMS.renderers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rng = np.random.default_rng(0)
+        inflow = np.round(rng.uniform(0, 10_000, rows), 2)
+        outflow = np.round(rng.uniform(0, 10_000, rows), 2)
+        report = pd.DataFrame({
+            'date': pd.date_range('2000-01-01', periods=rows, freq='h', tz='UTC'),
+            'inflow': [Decimal(f'{value:.2f}') for value in inflow],
+            'outflow': [Decimal(f'{value:.2f}') for value in outflow],
+            'net_cash_flow': [Decimal(f'{value:.2f}') for value in inflow - outflow],
+        }).to_dict('records')
+
+        encoders = {
+            'DjangoJSONEncoder': lambda: json.dumps(report, cls=DjangoJSONEncoder).encode(),
+            'AMS.renderers' + (' (orjson)' if renderers.orjson else ' (json)'): lambda: renderers.dumps(report),
+        }
+        self.stdout.write(f"Encoding {rows} report rows, best of {options['repeat']}:")
+        for name, encode in encoders.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                payload = encode()
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f"  {name:<28} {min(timings) * 1000:9.1f} ms  {len(payload) / 1024:9.1f} KiB")
@@ -0,0 +1,81 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from operations.worker import claim_jobs, purge_expired_jobs, run_job
+
+
+# Database connections inherited from the parent, kept referenced so they are never closed in the child.
+_inherited_connections = []
+
+
+def initialize_worker():
+    # Forked workers must not use the parent's database connections, and must not close them either:
+    # closing (or garbage collecting) an inherited socket tells PostgreSQL to end the parent's session.
+    django.setup()
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            _inherited_connections.append(connection.connection)
+            connection.connection = None
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help="Number of worker processes.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait between polls when there is nothing to run.")
+        parser.add_argument('--once', action='store_true', help="Exit once no job is queued or running.")
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'] or os.cpu_count() or 1, 1)
+        self.stdout.write(f"Starting job worker with {processes} processes.")
+
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=processes, initializer=initialize_worker)
+        running = set()
+        try:
+            while True:
+                purge_expired_jobs()
+                try:
+                    for job_id, attempt in claim_jobs(processes - len(running)):
+                        running.add(pool.submit(run_job, job_id, attempt))
+                except BrokenProcessPool:
+                    # The claimed job's lease lapses and another worker, or this one, retries it.
+                    pool, running = self.restart_pool(pool, processes), set()
+                    continue
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    try:
+                        self.stdout.write(f"Finished job {future.result()}.")
+                    except BrokenProcessPool:
+                        broken = True
+                    except Exception as e:
+                        self.stderr.write(f"Job process failed: {e}")
+                if broken:
+                    pool, running = self.restart_pool(pool, processes), set()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def restart_pool(self, pool, processes):
+        """Replace a pool whose worker process died; its jobs are retried once their leases lapse."""
+        self.stderr.write("A worker process died; restarting the process pool.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=processes, initializer=initialize_worker)
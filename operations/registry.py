@@ -0,0 +1,28 @@
+from operations.models import Job
+
+TASKS = {}
+
+
+def register_task(name):
+    """Register a function that the worker can run as job ``name``.
+
+    Tasks receive the job's business id and params as keyword arguments and
+    must return something JSON-serializable.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise ValueError(f"No task is registered as '{name}'.")
+
+
+def enqueue(name, business, user=None, params=None, max_attempts=3):
+    get_task(name)
+    return Job.objects.create(name=name, business=business, user=user, params=params or {},
+                              max_attempts=max_attempts)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+from operations.versioning import get_data_version
+from users.identity import get_user_identity
+
+
+def response_cache_key(name, request, business_id):
+    params = {
+        'path': request.path,
+        'query': sorted(request.query_params.lists()),
+        'data': request.data if isinstance(request.data, dict) else list(request.data),
+        'today': date.today().isoformat(),
+    }
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'response:{name}:{business_id}:{get_data_version(business_id)}:{digest}'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return any(tag.strip() in (etag, '*') for tag in if_none_match.split(','))
+
+
+def cached_response(name):
+    """Cache a GET action's response per business data version and request parameters.
+
+    The key doubles as a strong ETag, so a matching If-None-Match gets a 304
+    from the cached identity and data version alone, without running the
+    view. Any write to the business's finance data bumps the data version,
+    which changes every key and invalidates the cached responses in every
+    process. Both lookups go to the cache backend, so a 304 touches no
+    database only with Redis (REDIS_URL); the database cache fallback
+    answers them from its cache table.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            identity = get_user_identity(request.user)
+            business_id = identity['business_id'] if identity else None
+            if business_id is None:
+                return view_method(self, request, *args, **kwargs)
+
+            key = response_cache_key(name, request, business_id)
+            etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+            if etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                cached = cache.get(key)
+                if cached is not None:
+                    content, content_type = cached
+                    response = HttpResponse(content, content_type=content_type)
+                else:
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code != 200 or getattr(response, 'streaming', False):
+                        return response
+                    cache.set(key, (response.content, response['Content-Type']),
+                              timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
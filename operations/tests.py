@@ -1,3 +1,216 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+
+from finance.models import Liability
+from operations.admission import AdmissionPool
+from operations.coalescing import coalesce
+from operations.models import Job
+from operations.registry import enqueue, register_task
+from operations.versioning import bump_data_version, data_version_key, get_data_version
+from operations.worker import claim_jobs, run_job
+from users.models import Business, User
+
+
+def create_business_user(name='Acme'):
+    business = Business.objects.create(business_name=name, business_address='1 Main St', business_type='Retail',
+                                       business_email=f'{name.lower()}@example.com')
+    user = User.objects.create_user(username=name.lower(), email=f'owner@{name.lower()}.com', password='secret',
+                                    business=business)
+    user.groups.add(Group.objects.get_or_create(name='Owner')[0])
+    return business, user
+
+
+@register_task('operations.tests.echo')
+def echo(business_id, value=None, fail=False):
+    if fail:
+        raise RuntimeError("Task failed.")
+    return {'business': business_id, 'value': value}
+
+
+class DataVersionTests(TestCase):
+    def test_bump_changes_the_version(self):
+        version = get_data_version(1)
+        self.assertEqual(get_data_version(1), version)
+        self.assertEqual(bump_data_version(1), version + 1)
+        self.assertEqual(get_data_version(1), version + 1)
+
+    def test_lost_version_restarts_above_the_old_one(self):
+        version = bump_data_version(2)
+        cache.delete(data_version_key(2))
+        self.assertGreater(bump_data_version(2), version)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CoalescingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, started=None, release=None):
+        self.calls += 1
+        if started:
+            started.set()
+            release.wait(5)
+        return {'calls': self.calls}
+
+    def test_concurrent_identical_calls_compute_once(self):
+        started, release = threading.Event(), threading.Event()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            coalesce('report', 1, {'layout': 'records'}, lambda: self.compute(started, release))))
+            for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'calls': 1}] * 4)
+
+    def test_different_parameters_and_new_data_are_computed_again(self):
+        self.assertEqual(coalesce('report', 1, {'layout': 'records'}, self.compute), {'calls': 1})
+        self.assertEqual(coalesce('report', 1, {'layout': 'records'}, self.compute), {'calls': 1})
+        self.assertEqual(coalesce('report', 1, {'layout': 'columnar'}, self.compute), {'calls': 2})
+        self.assertEqual(coalesce('report', 2, {'layout': 'records'}, self.compute), {'calls': 3})
+
+        bump_data_version(1)
+        self.assertEqual(coalesce('report', 1, {'layout': 'records'}, self.compute), {'calls': 4})
+
+
+class CachedResponseTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = '/finance/liabilities/total-liabilities/'
+
+    def test_matching_etag_gets_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_invalidate_the_cached_response(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Liability.objects.create(user=self.user, business=self.business, name='Loan', amount=500,
+                                     description='Loan', date_incurred=date(2024, 1, 1), liability_type='Current',
+                                     due_date=date(2025, 1, 1))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(Decimal(response.json()['total_liabilities']), 500)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_timings_are_not_sent_when_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/finance/liabilities/total-liabilities/'))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    def test_timings_are_sent_when_enabled(self):
+        response = self.client.get('/finance/liabilities/total-liabilities/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+
+class AdmissionPoolTests(TestCase):
+    def setUp(self):
+        self.pool = AdmissionPool('test', concurrency=2, per_business=1, max_queue=4, max_wait=0)
+
+    def test_limits_hold_per_business_and_overall(self):
+        first = self.pool.admit(1)
+        with self.assertRaises(Throttled):
+            self.pool.admit(1)
+        second = self.pool.admit(2)
+        with self.assertRaises(Throttled):
+            self.pool.admit(3)
+        self.assertEqual(self.pool.metrics()['in_flight'], 2)
+
+        first.release()
+        self.pool.admit(3).release()
+        second.release()
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics['in_flight'], metrics['admitted'], metrics['rejected']), (0, 3, 2))
+
+    def test_pools_with_the_same_name_share_their_slots(self):
+        # Separate instances stand in for separate server processes.
+        other = AdmissionPool('test', concurrency=2, per_business=1, max_queue=4, max_wait=0)
+        ticket = self.pool.admit(1)
+        with self.assertRaises(Throttled):
+            other.admit(1)
+        ticket.release()
+        other.admit(1).release()
+
+
+class JobLeaseTests(TestCase):
+    def setUp(self):
+        self.business, self.user = create_business_user()
+
+    def test_claimed_jobs_are_not_claimed_again_while_leased(self):
+        job = enqueue('operations.tests.echo', self.business, params={'value': 1})
+        self.assertEqual(claim_jobs(5), [(job.id, 1)])
+        self.assertEqual(claim_jobs(5), [])
+
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_jobs(5), [(job.id, 2)])
+
+    def test_run_job_stores_the_result_while_holding_the_lease(self):
+        job = enqueue('operations.tests.echo', self.business, params={'value': 'x'})
+        [(job_id, attempt)] = claim_jobs(1)
+        run_job(job_id, attempt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.lease_expires_at), ('Succeeded', {'business': self.business.id,
+                                                                                       'value': 'x'}, None))
+
+    def test_a_worker_that_lost_its_lease_discards_its_outcome(self):
+        job = enqueue('operations.tests.echo', self.business)
+        [(job_id, stale_attempt)] = claim_jobs(1)
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        [(_, attempt)] = claim_jobs(1)
+
+        with self.assertLogs('operations.worker', 'WARNING'):
+            run_job(job_id, stale_attempt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('Running', attempt))
+
+    def test_failures_are_retried_until_attempts_run_out(self):
+        job = enqueue('operations.tests.echo', self.business, params={'fail': True}, max_attempts=2)
+        with self.assertLogs('operations.worker', 'WARNING'):
+            run_job(*claim_jobs(1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('Queued', 1))
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        with self.assertLogs('operations.worker', 'WARNING'):
+            run_job(*claim_jobs(1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
+        self.assertIn('Task failed.', job.error)
+
+    def test_jobs_that_kill_their_worker_fail_after_the_last_attempt(self):
+        job = enqueue('operations.tests.echo', self.business, max_attempts=1)
+        claim_jobs(1)
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_jobs(1), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
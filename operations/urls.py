@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import JobViewSet, AdmissionMetricsViewSet
+
+router = DefaultRouter()
+router.register(r'jobs', JobViewSet, basename='jobs')
+router.register(r'admission', AdmissionMetricsViewSet, basename='admission')
+urlpatterns = [
+    path('', include(router.urls)),
+]
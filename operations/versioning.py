@@ -0,0 +1,41 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def data_version_key(business_id):
+    return f'data_version:{business_id}'
+
+
+def get_data_version(business_id):
+    """Current version of a business's finance data; it changes whenever that data does.
+
+    Versions live in the shared cache, so every web process, the job worker
+    and management commands agree on them, and reading one is a Redis round
+    trip rather than a query when REDIS_URL is set. They start from a
+    timestamp rather than zero, so a version lost from the cache is never
+    reissued for different data.
+    """
+    key = data_version_key(business_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(business_id):
+    key = data_version_key(business_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Lost from the cache: start again from a fresh timestamp, unless another process just did.
+        if cache.add(key, time.time_ns(), timeout=None):
+            return cache.get(key)
+        return cache.incr(key)
+
+
+def bump_data_version_on_commit(business_id):
+    """Bump the version once the current transaction commits (immediately outside of one)."""
+    transaction.on_commit(lambda: bump_data_version(business_id))
@@ -1,3 +1,75 @@
-from django.shortcuts import render
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework_simplejwt.models import TokenUser
 
-# Create your views here.
+from AMS.renderers import JsonResponse
+from users.models import User
+from finance.permissions import IsOwnerOrAdmin
+from .admission import admission_metrics
+from .models import Job
+from .serializers import JobSerializer
+
+
+def job_accepted(request, job):
+    """202 response pointing the client at a job it can poll."""
+    return JsonResponse({
+        "job": job.id,
+        "status": job.status,
+        "status_url": request.build_absolute_uri(reverse('jobs-detail', args=[job.id])),
+        "result_url": request.build_absolute_uri(reverse('jobs-result', args=[job.id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    def get_business(self):
+        user = self.request.user
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+
+        return getattr(user, 'business', None)
+
+    def get_queryset(self):
+        business = self.get_business()
+        if business is None:
+            return self.queryset.none()
+
+        return self.queryset.filter(business_id=business.id).order_by('-created_at')
+
+    def get_object(self):
+        business = self.get_business()
+        job_id = self.kwargs.get('pk')
+
+        if business:
+            try:
+                return Job.objects.get(business=business, id=job_id)
+            except (Job.DoesNotExist, ValueError):
+                raise Http404("No job matches the given query.")
+
+        raise Http404("No job matches the given query.")
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = self.get_object()
+
+        if job.expires_at and job.expires_at < timezone.now():
+            return JsonResponse({"error": "The result of this job has expired."}, status=status.HTTP_410_GONE)
+        if job.status == 'Failed':
+            return JsonResponse({"job": job.id, "status": job.status, "error": job.error},
+                                status=status.HTTP_200_OK)
+        if job.status != 'Succeeded':
+            return JsonResponse({"job": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+        return JsonResponse({"job": job.id, "status": job.status, "result": job.result}, status=status.HTTP_200_OK)
+
+
+class AdmissionMetricsViewSet(viewsets.ViewSet):
+    permission_classes = [IsOwnerOrAdmin]
+
+    def list(self, request):
+        return JsonResponse({"pools": admission_metrics()})
@@ -0,0 +1,121 @@
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from AMS.renderers import dumps
+from operations.models import Job
+from operations.registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def fail_abandoned_jobs(now):
+    """Fail running jobs whose lease expired on their last allowed attempt.
+
+    Their worker died mid-run, for example because the job killed its
+    process, and running them again would only repeat that.
+    """
+    return Job.objects.filter(status='Running', lease_expires_at__lt=now, attempts__gte=F('max_attempts')).update(
+        status='Failed', error='The worker running this job stopped before it finished.', lease_expires_at=None,
+        finished_at=now, expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+    )
+
+
+def claim_jobs(limit):
+    """Claim up to ``limit`` runnable jobs, returning ``(job_id, attempt)`` pairs.
+
+    Each claim is a conditional update on the job's current status, attempt
+    and lease, so when several workers race for the same job only one of
+    them gets it. Running jobs whose lease has expired belong to a worker
+    that died and can be claimed again. The claim counts the attempt, so a
+    job that keeps killing its worker still runs out of attempts, and the
+    attempt number fences off a worker that lost its lease.
+    """
+    now = timezone.now()
+    fail_abandoned_jobs(now)
+    runnable = Q(status='Queued', run_after__lte=now) | Q(status='Running', lease_expires_at__lt=now)
+    candidates = Job.objects.filter(runnable, attempts__lt=F('max_attempts')).order_by('run_after', 'id').values_list(
+        'id', 'status', 'attempts', 'lease_expires_at')[:limit * 2]
+
+    claimed = []
+    for job_id, status, attempts, lease_expires_at in candidates:
+        updated = Job.objects.filter(id=job_id, status=status, attempts=attempts,
+                                     lease_expires_at=lease_expires_at).update(
+            status='Running',
+            attempts=attempts + 1,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        )
+        if updated:
+            claimed.append((job_id, attempts + 1))
+        if len(claimed) == limit:
+            break
+    return claimed
+
+
+def held_lease(job_id, attempt):
+    return Job.objects.filter(id=job_id, status='Running', attempts=attempt)
+
+
+def keep_lease(job_id, attempt, stop):
+    """Extend the job's lease every JOB_HEARTBEAT_SECONDS until ``stop`` is set or the lease is lost."""
+    try:
+        while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+            lease_expires_at = timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            if not held_lease(job_id, attempt).update(lease_expires_at=lease_expires_at):
+                break
+    finally:
+        connection.close()
+
+
+def run_job(job_id, attempt):
+    """Run a claimed job and store its result, scheduling a retry if it fails.
+
+    The lease is renewed while the task runs, and the outcome is only
+    written if this worker still holds the lease for ``attempt``.
+    """
+    job = Job.objects.get(id=job_id)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=keep_lease, args=(job_id, attempt, stop), daemon=True)
+    heartbeat.start()
+    try:
+        result = get_task(job.name)(business_id=job.business_id, **job.params)
+        result = json.loads(dumps(result))
+    except Exception as e:
+        logger.warning("Job %s (%s) failed on attempt %s: %s", job.id, job.name, attempt, e)
+        now = timezone.now()
+        if attempt < job.max_attempts:
+            outcome = dict(
+                status='Queued', error=traceback.format_exc(), lease_expires_at=None,
+                run_after=now + timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)),
+            )
+        else:
+            outcome = dict(
+                status='Failed', error=traceback.format_exc(), lease_expires_at=None,
+                finished_at=now, expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+            )
+    else:
+        now = timezone.now()
+        outcome = dict(
+            status='Succeeded', result=result, error='', lease_expires_at=None,
+            finished_at=now, expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+        )
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    if not held_lease(job.id, attempt).update(**outcome):
+        logger.warning("Job %s (%s) lost its lease on attempt %s; discarding its outcome.", job.id, job.name, attempt)
+    return job.id
+
+
+def purge_expired_jobs():
+    deleted, _ = Job.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.models import TokenUser
+
+from .models import User
+
+
+def user_identity_key(user_id):
+    return f'user_identity:{user_id}'
+
+
+def get_user_identity(user):
+    """Business, groups and superuser flag of ``user``, cached so permission checks skip the database."""
+    if not user or not user.is_authenticated:
+        return None
+
+    key = user_identity_key(user.id)
+    identity = cache.get(key)
+    if identity is None:
+        if isinstance(user, TokenUser):
+            user = User.objects.get(id=user.id)
+        identity = {
+            'id': user.id,
+            'business_id': user.business_id,
+            'groups': list(user.groups.values_list('name', flat=True)),
+            'is_superuser': user.is_superuser,
+        }
+        cache.set(key, identity, timeout=settings.USER_IDENTITY_CACHE_TIMEOUT)
+    return identity
+
+
+def invalidate_user_identity(user_id):
+    cache.delete(user_identity_key(user_id))
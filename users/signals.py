@@ -1,3 +1,28 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .identity import invalidate_user_identity
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user_identity(instance.id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Clearing is handled before it happens, while the group's users can still be looked up.
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        for user_id in pk_set or User.objects.filter(groups=instance).values_list('id', flat=True):
+            invalidate_user_identity(user_id)
+    else:
+        invalidate_user_identity(instance.id)
+
+
 # from django.db.models.signals import post_save
 # from django.dispatch import receiver
 # from django.core.mail import send_mail
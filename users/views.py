@@ -1,4 +1,4 @@
-from django.http import JsonResponse
+from AMS.renderers import JsonResponse
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -23,7 +23,6 @@ class BusinessRegistrationView(viewsets.ModelViewSet):
         business = business_serializer.save()
 
         user = User.objects.get(id=request.user.id)
-        print(f"Retrieved user object: {user}")
 
         if not hasattr(user, 'groups'):
             return Response({"detail": "User does not have groups attribute."}, status=status.HTTP_400_BAD_REQUEST)
@@ -91,11 +90,8 @@ class BusinessStaffRegistrationView(viewsets.ModelViewSet):
 class CustomUserViewSet(UserViewSet):
     def me(self, request, *args, **kwargs):
         user = request.user
-        print(f"Request User: {user}")
         if not user:
             return Response({"detail": "User instance is None"}, status=status.HTTP_400_BAD_REQUEST)
-        print(f"User ID: {user.id}, Username: {user.username}, Email: {user.email}")
 
         response = super().update(request, *args, **kwargs)
-        print(f"Response Data: {response.data}")
         return response